@@ -1,10 +1,46 @@
+import asyncio
+import hashlib
 import json
-import requests
-from fastapi import FastAPI, HTTPException
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, EmailStr
+from fastapi.responses import StreamingResponse
+from pydantic import EmailStr
+
+from change_notifier import ChangeNotifier
+from metrics import REGISTRY, CallbackMetric, MetricsMiddleware
+from models import MAX_STORED_INT, StoredInt, Student, SummaryJobRequest
+from ollama_client import OllamaClient, OllamaError, SingleFlight
+from response_compression import CompressionMiddleware, strip_etag_encoding
+from student_bulk import BulkImport, encode_csv, read_rows
+from student_store import (
+    ChangesUnavailableError,
+    DuplicateEmailError,
+    DuplicateIdError,
+    StudentNotFoundError,
+    open_store,
+)
+from summary_cache import SummaryCache
+from summary_jobs import PermanentJobError, SummaryJobManager
+from summary_scheduler import BATCH, INTERACTIVE, SchedulerFullError, SummaryScheduler
 
-app = FastAPI()
+# The `lifespan` handler resumes unfinished bulk summary jobs on startup. When the app shuts down it stops them,
+# releases the Ollama connection pool, saves the summary cache and closes the database connections.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await summary_jobs.resume()
+    yield
+    await summary_jobs.aclose()
+    await ollama_client.aclose()
+    summary_cache.close()
+    store.close()
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS (Cross-Origin Resource Sharing) middleware is added to the FastAPI app to allow cross-origin requests. 
 # This is particularly useful when the backend and frontend are served from different domains or ports during development. 
@@ -18,129 +54,535 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers in requests
 )
 
-# In-memory database, represented by a dictionary `students` to store the student data, and a set `emails` 
-# to track unique email addresses for students. This allows the app to perform CRUD operations on student records 
-# while ensuring uniqueness of student IDs and emails.
-students = {}
-emails = set()
+# `CompressionMiddleware` compresses single-body responses of at least `COMPRESSION_MIN_SIZE` bytes with zstd or gzip,
+# whichever the client accepts (zstd only when a zstd module is installed). Streamed responses are never compressed.
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.environ.get("COMPRESSION_MIN_SIZE", "1024")))
+
+# `MetricsMiddleware` times every request by route template and counts requests in flight for `GET /metrics`.
+app.add_middleware(MetricsMiddleware)
+
+# The student database is a pluggable repository from `student_store.py`. By default it is an SQLite file in WAL mode,
+# which survives restarts and can be shared by several uvicorn workers, with uniqueness of student IDs and emails
+# enforced by the store itself. Set `STUDENT_STORE=memory` to use the old in-process dictionary instead.
+store = open_store()
+change_notifier = ChangeNotifier()
+store.subscribe(change_notifier.notify)
 
 # Ollama API URL and model settings are defined to interface with the Ollama API, 
 # which will be used to generate summaries for students. This is done by calling a helper function that interacts 
-# with the API to get summaries based on student details.
-OLLAMA_API_URL = "http://localhost:11434/api/chat"
-OLLAMA_MODEL = "llama3.2"
-
-# A Pydantic model `Student` is created to define the structure of the student data. 
-# This model enforces validation rules for the incoming data, such as checking the type and format of fields like `id`, 
-# `name`, `age`, and `email`.
-class Student(BaseModel):
-    id: int
-    name: str
-    age: int
-    email: EmailStr
+# with the API to get summaries based on student details. Both can be overridden with environment variables.
+OLLAMA_API_URL = os.environ.get("OLLAMA_API_URL", "http://localhost:11434/api/chat")
+OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "llama3.2")
+SUMMARY_PROMPT_TEMPLATE = (
+    "Generate a summary for a student. Name: {name}, Age: {age}, Email: {email}. "
+    "Provide a description of the student and any interesting traits."
+)
+
+# Generated summaries are kept in a bounded LRU/TTL cache keyed on a hash of the student's details, the model and the
+# prompt template, so repeat reads of an unchanged student never reach Ollama. `SUMMARY_CACHE_SIZE` and
+# `SUMMARY_CACHE_TTL` (seconds) bound the cache, and `SUMMARY_CACHE_PATH` optionally persists it to a JSON file.
+summary_cache = SummaryCache(
+    max_entries=int(os.environ.get("SUMMARY_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.environ.get("SUMMARY_CACHE_TTL", "86400")),
+    path=os.environ.get("SUMMARY_CACHE_PATH") or None,
+)
+
+# Page sizes for `GET /students`. `DEFAULT_PAGE_SIZE` applies when only `after_id` is given, `MAX_PAGE_SIZE` caps the
+# `limit` query parameter, and `STREAM_CHUNK_SIZE` is how many records are fetched and encoded per chunk when streaming NDJSON.
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 1000
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+JSON_MEDIA_TYPE = "application/json"
+
+# Bulk imports are validated and committed `BULK_BATCH_SIZE` rows at a time, and at most `BULK_MAX_ERRORS` row errors
+# are listed in the import report. Uploads are spooled to a temporary file once they exceed `BULK_SPOOL_SIZE` bytes.
+BULK_BATCH_SIZE = 500
+BULK_MAX_ERRORS = 1000
+BULK_SPOOL_SIZE = 1024 * 1024
+
+# `GET /students/changes` returns at most `MAX_CHANGES_PAGE` changes per call. A long-poll waits at most
+# `MAX_CHANGES_WAIT` seconds. It is woken by `change_notifier` when this process changes a student, and re-checks the
+# change log every `CHANGES_POLL_INTERVAL` seconds for changes made by other worker processes.
+MAX_CHANGES_PAGE = 1000
+MAX_CHANGES_WAIT = 60
+CHANGES_POLL_INTERVAL = 1.0
+REVISION_HEADER = "X-Store-Revision"
+EPOCH_HEADER = "X-Store-Epoch"
+
+# A single pooled async client is shared by all summary requests. `OLLAMA_CONNECT_TIMEOUT` and `OLLAMA_READ_TIMEOUT`
+# (seconds) bound connecting and waiting for each streamed chunk, and `OLLAMA_MAX_CONNECTIONS` sizes the pool.
+# `summary_flight` makes concurrent requests for the same unchanged student share one upstream generation.
+ollama_client = OllamaClient(
+    OLLAMA_API_URL,
+    OLLAMA_MODEL,
+    connect_timeout=float(os.environ.get("OLLAMA_CONNECT_TIMEOUT", "5")),
+    read_timeout=float(os.environ.get("OLLAMA_READ_TIMEOUT", "120")),
+    max_connections=int(os.environ.get("OLLAMA_MAX_CONNECTIONS", "20")),
+)
+summary_flight = SingleFlight()
+
+# Every generation takes a slot from `summary_scheduler` before calling Ollama. `SUMMARY_CONCURRENCY` is how many
+# generations run at once (match it to the model's `OLLAMA_NUM_PARALLEL`), and `SUMMARY_QUEUE_SIZE` is how many
+# requests of a priority class may wait before further ones are rejected with 429. Interactive requests are served
+# before bulk summary jobs.
+summary_scheduler = SummaryScheduler(
+    concurrency=int(os.environ.get("SUMMARY_CONCURRENCY", "1")),
+    max_queue=int(os.environ.get("SUMMARY_QUEUE_SIZE", "32")),
+)
 
 # A helper function `get_ollama_summary` is defined to interact with the Ollama API. 
 # It sends a request with a dynamically constructed prompt containing the student's details to generate a summary.
-# The function handles the response from the API, streaming it in chunks and accumulating the content to build the final summary.
-def get_ollama_summary(student: Student) -> str:
-    prompt = f"Generate a summary for a student. Name: {student.name}, Age: {student.age}, Email: {student.email}. Provide a description of the student and any interesting traits."
-    payload = {
-        "model": OLLAMA_MODEL,
-        "messages": [{"role": "user", "content": prompt}],
-        "stream": True
-    }
-    headers = {
-        'Content-Type': 'application/json',
-    }
+# The pooled client streams the response in chunks and accumulates the content to build the final summary.
+# `OllamaError` is raised if no summary could be generated.
+async def get_ollama_summary(student: Student) -> str:
+    prompt = SUMMARY_PROMPT_TEMPLATE.format(name=student.name, age=student.age, email=student.email)
+    return await ollama_client.chat(prompt)
 
-    try:
-        response = requests.post(OLLAMA_API_URL, json=payload, headers=headers, stream=True)
-        response.raise_for_status()
-
-        output = ""
-        for line in response.iter_lines():
-            if line:
-                body = json.loads(line.decode('utf-8'))
-                if "error" in body:
-                    raise Exception(body["error"])
-                if not body.get("done", False):
-                    message = body.get("message", "")
-                    content = message.get("content", "")
-                    output += content
-                if body.get("done", False):
-                    return output
-
-        return "Response still being processed."
-
-    except requests.exceptions.RequestException as e:
-        print(f"Error: {e}")
-        return "Error generating summary"
-    except ValueError as ve:
-        print(f"JSON Parsing Error: {ve}")
-        return "Error parsing response"
+# A helper function `stream_ollama_summary` is the streaming counterpart of `get_ollama_summary`: it returns an async
+# generator that yields the summary tokens as Ollama produces them. Closing it aborts the upstream generation.
+def stream_ollama_summary(student: Student):
+    prompt = SUMMARY_PROMPT_TEMPLATE.format(name=student.name, age=student.age, email=student.email)
+    return ollama_client.stream_chat(prompt)
 
 # The FastAPI app defines several CRUD (Create, Read, Update, Delete) routes for managing student records.
 
-# The `create_student` route allows the creation of a new student by checking whether the student ID 
-# and email already exist in the database. If they do, a 400 error is raised.
+# The `create_student` route allows the creation of a new student. The store rejects the student if the ID
+# or email already exists, in which case a 400 error is raised.
 @app.post("/students")
 def create_student(student: Student):
-    if student.id in students:
+    try:
+        return store.add(student)
+    except DuplicateIdError:
         raise HTTPException(status_code=400, detail="Student with this ID already exists.")
-    
-    if student.email in emails:
+    except DuplicateEmailError:
         raise HTTPException(status_code=400, detail="Student with this email already exists.")
-    
-    students[student.id] = student
-    emails.add(student.email)
-    return student
 
-# The `get_all_students` route retrieves all students stored in the database.
+# The `bulk_import_students` route loads many students from one CSV (`Content-Type: text/csv` or `?format=csv`) or
+# NDJSON upload. The body is spooled to a temporary file as it arrives and then processed in batches off the event
+# loop, so memory use stays constant whatever the file size. Each batch is committed all-or-nothing, and the
+# response reports how many students were inserted together with the errors of the rejected rows.
+@app.post("/students/bulk")
+async def bulk_import_students(request: Request, format: Optional[str] = None):
+    if format is None:
+        format = "csv" if "text/csv" in request.headers.get("content-type", "") else "ndjson"
+    if format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="Unsupported format, use csv or ndjson.")
+
+    with tempfile.SpooledTemporaryFile(max_size=BULK_SPOOL_SIZE) as upload:
+        async for chunk in request.stream():
+            upload.write(chunk)
+        upload.seek(0)
+        bulk_import = BulkImport(store, batch_size=BULK_BATCH_SIZE, max_errors=BULK_MAX_ERRORS)
+        return await run_in_threadpool(bulk_import.run, read_rows(upload, format))
+
+# A helper function `make_etag` builds a strong entity tag from a hash of the given bytes.
+def make_etag(*parts: bytes) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part)
+    return f'"{digest.hexdigest()}"'
+
+# A helper function `if_none_match` tells whether the request's `If-None-Match` header lists `etag`, meaning the client
+# already has this version and gets a 304 response without a body. A coding suffix added by `CompressionMiddleware`
+# is ignored, since the compressed and uncompressed bodies hold the same data.
+def if_none_match(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    tags = {strip_etag_encoding(tag.strip().removeprefix("W/")) for tag in header.split(",")}
+    return "*" in tags or etag in tags
+
+# A generator `iter_student_pages` walks the store in ID order one chunk at a time using keyset pagination.
+# Only one chunk is held in memory at once, so walking the whole table runs in constant memory.
+# If `limit` is given, at most that many records are returned. With `encoded`, chunks hold the `(id, JSON bytes)`
+# pairs of `store.page_json` instead of students.
+def iter_student_pages(after_id: Optional[int] = None, limit: Optional[int] = None, encoded: bool = False):
+    remaining = limit
+    while remaining is None or remaining > 0:
+        chunk_size = STREAM_CHUNK_SIZE if remaining is None else min(STREAM_CHUNK_SIZE, remaining)
+        chunk = store.page_json(after_id, chunk_size) if encoded else store.page(after_id, chunk_size)
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        after_id = chunk[-1][0] if encoded else chunk[-1].id
+        if remaining is not None:
+            remaining -= len(chunk)
+
+# A generator `stream_students_ndjson` writes each chunk of encoded students as newline-delimited JSON as it is read.
+def stream_students_ndjson(after_id: Optional[int], limit: Optional[int]):
+    for chunk in iter_student_pages(after_id, limit, encoded=True):
+        yield b"".join(body + b"\n" for _, body in chunk)
+
+# A generator `stream_students_csv` encodes each chunk of students to CSV as it is read, after a header row.
+def stream_students_csv():
+    yield encode_csv([], header=True)
+    for chunk in iter_student_pages():
+        yield encode_csv(chunk)
+
+# The `get_all_students` route retrieves students stored in the database. Without query parameters it returns the
+# full list as before. With `after_id` and/or `limit` it returns one page ordered by ID together with `next_after_id`,
+# the cursor for the following page (null on the last page). Clients that send `Accept: application/x-ndjson` or
+# `?format=ndjson` get the records streamed as NDJSON instead. The `X-Store-Revision` header carries the store revision
+# read before the data, which a client can pass to `GET /students/changes` to stay in sync from then on, and the
+# `X-Store-Epoch` header the epoch that revision belongs to.
+# Responses are assembled from the JSON bytes of `store.page_json` rather than encoded by FastAPI.
+# The ETag is derived from the store epoch and revision, so a client that sends it back in `If-None-Match` gets a 304 response
+# until any student changes, without the data being read at all. Since the `Accept` header picks JSON or NDJSON, every
+# response carries `Vary: Accept` so shared caches keep the two apart.
 @app.get("/students")
-def get_all_students():
-    return list(students.values())
+def get_all_students(
+    request: Request,
+    after_id: Optional[StoredInt] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    format: Optional[str] = None,
+):
+    epoch = store.epoch()
+    revision = store.revision()
+    ndjson = format == "ndjson" or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+    headers = {
+        REVISION_HEADER: str(revision),
+        EPOCH_HEADER: epoch,
+        "ETag": f'"students-{epoch}-{revision}{"-ndjson" if ndjson else ""}"',
+        "Vary": "Accept",
+    }
+    if if_none_match(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    if ndjson:
+        return StreamingResponse(stream_students_ndjson(after_id, limit), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
+    if after_id is None and limit is None:
+        bodies = [body for chunk in iter_student_pages(encoded=True) for _, body in chunk]
+        return Response(content=b"[" + b",".join(bodies) + b"]", media_type=JSON_MEDIA_TYPE, headers=headers)
 
-# The `get_student` route fetches a student by their ID. If the student doesn't exist, 
-# a 404 error is raised.
+    limit = limit or DEFAULT_PAGE_SIZE
+    items = store.page_json(after_id, limit)
+    next_after_id = items[-1][0] if len(items) == limit else None
+    bodies = b",".join(body for _, body in items)
+    content = b'{"items":[%s],"next_after_id":%s}' % (bodies, json.dumps(next_after_id).encode())
+    return Response(content=content, media_type=JSON_MEDIA_TYPE, headers=headers)
+
+# The `get_student_changes` route returns the inserts, updates and deletes made after revision `since`, oldest first,
+# together with the store's `epoch`, the current `revision` and `next_since`, the revision to ask for next. A client
+# that loaded the table at some revision can stay in sync by applying these changes instead of downloading everything
+# again. It should send the `epoch` it got with that revision too: revisions restart when the store does, so a
+# different epoch means `since` no longer refers to this store's changes. With `wait` (seconds) the request
+# long-polls: if there are no changes yet, it waits until one arrives or the time runs out.
+# If the epoch differs, `since` is ahead of the store, or the bounded change log no longer reaches back to `since`,
+# a 410 error tells the client to reload the table.
+@app.get("/students/changes")
+async def get_student_changes(
+    since: int = Query(0, ge=0, le=MAX_STORED_INT),
+    limit: int = Query(MAX_CHANGES_PAGE, ge=1, le=MAX_CHANGES_PAGE),
+    wait: float = Query(0, ge=0, le=MAX_CHANGES_WAIT),
+    epoch: Optional[str] = None,
+):
+    unavailable = HTTPException(status_code=410, detail="Changes since this revision are no longer available; reload the students.")
+    if epoch is not None and epoch != store.epoch():
+        raise unavailable
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    while True:
+        changed = change_notifier.event()
+        try:
+            changes = await run_in_threadpool(store.changes, since, limit)
+        except ChangesUnavailableError:
+            raise unavailable
+        remaining = deadline - loop.time()
+        if changes or remaining <= 0:
+            break
+        await change_notifier.wait(changed, min(remaining, CHANGES_POLL_INTERVAL))
+    next_since = changes[-1]["revision"] if changes else since
+    return {"epoch": store.epoch(), "revision": store.revision(), "next_since": next_since, "changes": changes}
+
+# The `search_students` route finds students by an inclusive age range, a case-insensitive name prefix or substring,
+# and/or an exact email. All given criteria must match. The email is normalized like a student's own email, so it
+# matches whatever case its domain was written in, and an invalid email is rejected with a 422 error. Each criterion is answered from a secondary index kept up to
+# date by the store on every create, update and delete, so searches do not scan the whole table. Results are ordered
+# by ID and paged like `GET /students`, with `after_id`, `limit` and `next_after_id`.
+@app.get("/students/search")
+def search_students(
+    min_age: Optional[StoredInt] = None,
+    max_age: Optional[StoredInt] = None,
+    name_prefix: Optional[str] = None,
+    name_contains: Optional[str] = None,
+    email: Optional[EmailStr] = None,
+    after_id: Optional[StoredInt] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    items = store.search(
+        min_age=min_age,
+        max_age=max_age,
+        name_prefix=name_prefix,
+        name_contains=name_contains,
+        email=email,
+        after_id=after_id,
+        limit=limit,
+    )
+    next_after_id = items[-1].id if len(items) == limit else None
+    return {"items": items, "next_after_id": next_after_id}
+
+# The `export_students` route streams every student as a CSV or NDJSON file download.
+@app.get("/students/export")
+def export_students(format: str = Query("csv", pattern="^(csv|ndjson)$")):
+    if format == "csv":
+        body, media_type = stream_students_csv(), "text/csv"
+    else:
+        body, media_type = stream_students_ndjson(None, None), NDJSON_MEDIA_TYPE
+    headers = {"Content-Disposition": f'attachment; filename="students.{format}"'}
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+# The `get_student` route fetches a student by their ID and returns the store's JSON encoding of it as is, with an
+# ETag hashed from those bytes; a matching `If-None-Match` gets a 304 response instead.
+# If the student doesn't exist, a 404 error is raised.
 @app.get("/students/{student_id}")
-def get_student(student_id: int):
-    if student_id not in students:
+def get_student(student_id: StoredInt, request: Request):
+    body = store.get_json(student_id)
+    if body is None:
         raise HTTPException(status_code=404, detail="Student not found.")
-    return students[student_id]
+    headers = {"ETag": make_etag(body)}
+    if if_none_match(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=JSON_MEDIA_TYPE, headers=headers)
 
 # The `update_student` route updates an existing student's information. 
 # It checks that the student exists, and if the email is updated, ensures it is unique.
 @app.put("/students/{student_id}")
-def update_student(student_id: int, updated_student: Student):
-    if student_id not in students:
+def update_student(student_id: StoredInt, updated_student: Student):
+    try:
+        student = store.update(student_id, updated_student)
+    except StudentNotFoundError:
         raise HTTPException(status_code=404, detail="Student not found.")
-    
-    if updated_student.email != students[student_id].email:
-        if updated_student.email in emails:
-            raise HTTPException(status_code=400, detail="Email already in use.")
-    
-    students[student_id] = updated_student
-    return updated_student
+    except DuplicateEmailError:
+        raise HTTPException(status_code=400, detail="Email already in use.")
+    summary_cache.invalidate(student_id)
+    return student
 
 # The `delete_student` route removes a student from the database. 
-# It ensures the student exists, deletes their email from the set, 
-# and removes their record from the `students` dictionary.
+# It ensures the student exists and removes their record and email from the store.
 @app.delete("/students/{student_id}")
-def delete_student(student_id: int):
-    if student_id not in students:
+def delete_student(student_id: StoredInt):
+    try:
+        store.delete(student_id)
+    except StudentNotFoundError:
         raise HTTPException(status_code=404, detail="Student not found.")
-    
-    emails.remove(students[student_id].email)
-    del students[student_id]
+    summary_cache.invalidate(student_id)
     return {"detail": "Student deleted successfully"}
 
+# A helper function `summarize_student` returns the summary of a student from the cache, or generates and caches it.
+# Concurrent calls for the same unchanged student are joined into a single generation through `summary_flight`, which
+# then waits for a slot from `summary_scheduler` at the priority of the most urgent caller so far: a caller joining a
+# generation that is still queued raises its priority. `SchedulerFullError` is raised when the scheduler's queue is
+# full.
+async def summarize_student(student: Student, priority: int = INTERACTIVE) -> str:
+    cache_key = SummaryCache.make_key(student, OLLAMA_MODEL, SUMMARY_PROMPT_TEMPLATE)
+    summary = summary_cache.get(cache_key)
+    if summary is not None:
+        return summary
+
+    async def generate():
+        async with summary_scheduler.slot(priority, key=cache_key):
+            summary = await get_ollama_summary(student)
+        summary_cache.put(student.id, cache_key, summary)
+        return summary
+
+    # A generation already queued for this summary at a lower priority is moved up to this caller's.
+    summary_scheduler.raise_priority(cache_key, priority)
+    return await summary_flight.do(cache_key, generate)
+
 # The `generate_summary` route generates a summary for a specific student using the Ollama API. 
-# If the student is not found, a 404 error is raised. The summary is returned as part of the response.
+# If the student is not found, a 404 error is raised. A cached summary is returned when the student is unchanged;
+# otherwise a new one is generated and cached. The summary is returned as part of the response.
+# If the summary queue is full, a 429 error is raised with a `Retry-After` header.
+# A summary carries an ETag hashed from its cache key and text, and a matching `If-None-Match` gets a 304 response.
 @app.get("/students/{student_id}/summary")
-def generate_summary(student_id: int):
-    if student_id not in students:
+async def generate_summary(student_id: StoredInt, request: Request, response: Response):
+    student = store.get(student_id)
+    if student is None:
         raise HTTPException(status_code=404, detail="Student not found.")
     
-    student = students[student_id]
-    summary = get_ollama_summary(student)
+    try:
+        summary = await summarize_student(student)
+    except SchedulerFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except OllamaError as e:
+        return {"summary": str(e)}
+    cache_key = SummaryCache.make_key(student, OLLAMA_MODEL, SUMMARY_PROMPT_TEMPLATE)
+    etag = make_etag(cache_key.encode(), summary.encode())
+    if if_none_match(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return {"summary": summary}
+
+# A helper function `format_sse` encodes one Server-Sent Event. The data is JSON so tokens containing newlines survive.
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# A helper function `wait_for_disconnect` returns once the client has closed the connection.
+async def wait_for_disconnect(request: Request) -> None:
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+# A generator `summary_events` produces the Server-Sent Events of a streamed summary. Tokens are read from Ollama by
+# a separate producer task and forwarded as `token` events as soon as they arrive. If the client disconnects, the
+# producer is cancelled, which closes the upstream response and stops the generation on the Ollama server.
+# A completed summary is cached and announced with a `done` event; a failure is reported with an `error` event.
+async def summary_events(request: Request, student: Student, cache_key: str):
+    queue = asyncio.Queue()
+
+    async def produce():
+        try:
+            async with summary_scheduler.slot(INTERACTIVE):
+                async for token in stream_ollama_summary(student):
+                    await queue.put(("token", token))
+            await queue.put(("done", None))
+        except (OllamaError, SchedulerFullError) as e:
+            await queue.put(("error", str(e)))
+
+    producer = asyncio.create_task(produce())
+    disconnected = asyncio.create_task(wait_for_disconnect(request))
+    next_item = None
+    parts = []
+    try:
+        while True:
+            next_item = asyncio.ensure_future(queue.get())
+            await asyncio.wait({next_item, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_item.done():
+                return
+            kind, value = next_item.result()
+            if kind == "token":
+                parts.append(value)
+                yield format_sse("token", {"token": value})
+            elif kind == "error":
+                yield format_sse("error", {"error": value})
+                return
+            else:
+                summary = "".join(parts)
+                summary_cache.put(student.id, cache_key, summary)
+                yield format_sse("done", {"summary": summary})
+                return
+    finally:
+        for task in (next_item, producer, disconnected):
+            if task is not None:
+                task.cancel()
+
+# The `stream_summary` route streams a student's summary as Server-Sent Events, so the first words appear as soon as
+# the model produces them instead of after the whole generation. A cached summary is sent as a single `token` event.
+# The generation waits for a slot from `summary_scheduler`; if its queue is already full, a 429 error is raised
+# with a `Retry-After` header before the stream starts.
+@app.get("/students/{student_id}/summary/stream")
+async def stream_summary(student_id: StoredInt, request: Request):
+    student = store.get(student_id)
+    if student is None:
+        raise HTTPException(status_code=404, detail="Student not found.")
+
+    cache_key = SummaryCache.make_key(student, OLLAMA_MODEL, SUMMARY_PROMPT_TEMPLATE)
+    summary = summary_cache.get(cache_key)
+    if summary is not None:
+        events = iter([format_sse("token", {"token": summary}), format_sse("done", {"summary": summary})])
+    else:
+        try:
+            summary_scheduler.ensure_capacity(INTERACTIVE)
+        except SchedulerFullError as e:
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+        events = summary_events(request, student, cache_key)
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(events, media_type="text/event-stream", headers=headers)
+
+# The `get_summary_cache_stats` route exposes the summary cache hit/miss counters and its current size.
+@app.get("/summaries/cache")
+def get_summary_cache_stats():
+    return summary_cache.stats()
+
+# The `get_summary_scheduler_stats` route exposes the generation slots in use, the queue depth per priority class,
+# the number of rejected requests, and the average and longest time spent waiting for a slot.
+@app.get("/summaries/scheduler")
+async def get_summary_scheduler_stats():
+    return summary_scheduler.stats()
+
+# A helper function `summarize_student_by_id` is used by bulk summary jobs, at batch priority. A student that no longer
+# exists is a permanent failure, while Ollama errors are raised as they are so the job retries the student. When the
+# scheduler's queue is full, the job waits and tries again without counting it as a failed attempt.
+async def summarize_student_by_id(student_id: int) -> str:
+    student = store.get(student_id)
+    if student is None:
+        raise PermanentJobError("Student not found.")
+    while True:
+        try:
+            return await summarize_student(student, BATCH)
+        except SchedulerFullError as e:
+            await asyncio.sleep(e.retry_after)
+
+# Bulk summary jobs are stored in their own SQLite database (`SUMMARY_JOBS_DB`) so they can be resumed after a restart.
+# `SUMMARY_JOB_CONCURRENCY` caps how many summaries the jobs of one worker process generate at once, and
+# `SUMMARY_JOB_MAX_ATTEMPTS` is how many times a failing student is tried before it is marked as failed. A worker
+# holds a lease of `SUMMARY_JOB_LEASE` seconds on the students it works on, renewed while it runs.
+summary_jobs = SummaryJobManager(
+    os.environ.get("SUMMARY_JOBS_DB", "summary_jobs.db"),
+    summarize_student_by_id,
+    concurrency=int(os.environ.get("SUMMARY_JOB_CONCURRENCY", "4")),
+    max_attempts=int(os.environ.get("SUMMARY_JOB_MAX_ATTEMPTS", "3")),
+    lease_seconds=float(os.environ.get("SUMMARY_JOB_LEASE", "60")),
+)
+
+# A helper function `select_student_ids` returns the IDs of the students matching a job's filter,
+# reading the matches from the store's search indexes one page at a time.
+def select_student_ids(job: SummaryJobRequest) -> list:
+    ids = []
+    after_id = None
+    while True:
+        page = store.search(
+            min_age=job.min_age,
+            max_age=job.max_age,
+            name_prefix=job.name_prefix,
+            after_id=after_id,
+            limit=STREAM_CHUNK_SIZE,
+        )
+        ids.extend(student.id for student in page)
+        if len(page) < STREAM_CHUNK_SIZE:
+            return ids
+        after_id = page[-1].id
+
+# The `create_summary_job` route starts a bulk summary job for the given student IDs, or for every student matching
+# the filter when no IDs are given. The job runs in the background; its ID is returned for polling.
+@app.post("/summaries/jobs", status_code=202)
+async def create_summary_job(job: SummaryJobRequest):
+    if job.ids is not None:
+        student_ids = job.ids
+    else:
+        student_ids = await run_in_threadpool(select_student_ids, job)
+    job_id = await summary_jobs.create(student_ids)
+    summary_jobs.start(job_id)
+    return {"job_id": job_id, "total": len(set(student_ids))}
+
+# The `get_summary_job` route reports a job's progress and the results of the students finished so far,
+# paged by student ID with `after_id` and `limit`. If the job doesn't exist, a 404 error is raised.
+@app.get("/summaries/jobs/{job_id}")
+async def get_summary_job(job_id: str, after_id: Optional[StoredInt] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+    progress = await summary_jobs.get(job_id, after_id, limit)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Summary job not found.")
+    return progress
+
+# Metrics read from the app's own objects when `GET /metrics` is scraped.
+REGISTRY.register(CallbackMetric("students", "Students in the store.", lambda: store.count()))
+REGISTRY.register(CallbackMetric("summary_cache_entries", "Summaries in the cache.", lambda: summary_cache.stats()["size"]))
+REGISTRY.register(CallbackMetric(
+    "summary_cache_hits_total", "Summary cache hits.", lambda: summary_cache.stats()["hits"], kind="counter"
+))
+REGISTRY.register(CallbackMetric(
+    "summary_cache_misses_total", "Summary cache misses.", lambda: summary_cache.stats()["misses"], kind="counter"
+))
+REGISTRY.register(CallbackMetric(
+    "summary_generations_in_flight", "Distinct summaries being generated.", lambda: summary_flight.in_flight()
+))
+REGISTRY.register(CallbackMetric("summary_queue_depth", "Summary requests waiting for a slot.", summary_scheduler.queued))
+REGISTRY.register(CallbackMetric("summary_slots_active", "Generation slots in use.", summary_scheduler.active))
+
+# The `get_metrics` route serves request latencies, Ollama timings and store and cache sizes in the Prometheus
+# text format, for scraping by Prometheus or any compatible agent.
+@app.get("/metrics")
+def get_metrics():
+    return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
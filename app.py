@@ -1,13 +1,28 @@
+import json
+
 import streamlit as st
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 
 API_URL = "http://127.0.0.1:8000"
 
+# Timeouts for backend calls as (connect, read) seconds; summaries are given longer to finish streaming
+REQUEST_TIMEOUT = (3.05, 30)
+SUMMARY_TIMEOUT = (3.05, 300)
+
+# Number of students shown per page of the table, and how long a fetched page is reused (seconds)
+PAGE_SIZE = 50
+PAGE_CACHE_TTL = 30
+
 # Initialize session state for created_students if not already initialized
 if "created_students" not in st.session_state:
     st.session_state["created_students"] = {}
 
+# Cursors of the table pages visited so far: the `after_id` each page starts from
+if "page_cursors" not in st.session_state:
+    st.session_state["page_cursors"] = [None]
+
 st.markdown("""
     <style>
         /* Set the background color to black for the entire app */
@@ -119,26 +134,76 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-# Display students in a table
+# One HTTP session with a connection pool, shared by every rerun and every user of the app
+@st.cache_resource
+def get_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+# The last ETag and body of each page, so an expired page is revalidated with If-None-Match instead of downloaded
+@st.cache_resource
+def get_page_validators():
+    return {}
+
+# Fetch one page of students from the backend; pages are cached until a student is changed
+@st.cache_data(ttl=PAGE_CACHE_TTL, show_spinner=False)
+def fetch_students_page(after_id, limit):
+    params = {"limit": limit}
+    if after_id is not None:
+        params["after_id"] = after_id
+    validators = get_page_validators()
+    known = validators.get((after_id, limit))
+    headers = {"If-None-Match": known[0]} if known else {}
+    response = get_session().get(f"{API_URL}/students", params=params, headers=headers, timeout=REQUEST_TIMEOUT)
+    if response.status_code == 304:
+        return known[1]
+    response.raise_for_status()
+    page = response.json()
+    if "ETag" in response.headers:
+        validators[(after_id, limit)] = (response.headers["ETag"], page)
+    return page
+
+# Display the current page of students with Previous/Next buttons
 def display_students():
-    response = requests.get(f"{API_URL}/students")
-    if response.status_code == 200:
-        students = response.json()
-        df = pd.DataFrame(students)
-        if not df.empty:
-            st.table(df)
-        else:
-            st.write("No students found.")
-    else:
+    cursors = st.session_state["page_cursors"]
+    try:
+        page = fetch_students_page(cursors[-1], PAGE_SIZE)
+    except requests.RequestException:
         st.error("Failed to fetch students.")
+        return
+
+    df = pd.DataFrame(page["items"])
+    if not df.empty:
+        st.dataframe(df, hide_index=True)
+    else:
+        st.write("No students found.")
+
+    previous_col, page_col, next_col = st.columns([1, 2, 1])
+    if previous_col.button("Previous", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    page_col.write(f"Page {len(cursors)}")
+    if next_col.button("Next", disabled=page["next_after_id"] is None):
+        cursors.append(page["next_after_id"])
+        st.rerun()
+
+# Send a create/update/delete request, clearing the cached pages if it succeeded
+def send_change(method, path, **kwargs):
+    try:
+        response = get_session().request(method, f"{API_URL}{path}", timeout=REQUEST_TIMEOUT, **kwargs)
+    except requests.RequestException:
+        return False
+    if response.status_code == 200:
+        fetch_students_page.clear()
+        return True
+    return False
 
 # Create a new student
 def create_student(id, name, age, email):
-    response = requests.post(
-        f"{API_URL}/students",
-        json={"id": id, "name": name, "age": age, "email": email},
-    )
-    if response.status_code == 200:
+    if send_change("POST", "/students", json={"id": id, "name": name, "age": age, "email": email}):
         st.success("Student created successfully!")
         # Store the created student in session state
         st.session_state["created_students"][id] = {"id": id, "name": name, "age": age, "email": email}
@@ -147,39 +212,57 @@ def create_student(id, name, age, email):
 
 # Update a student
 def update_student(id, name, age, email):
-    response = requests.put(
-        f"{API_URL}/students/{id}",
-        json={"id": id, "name": name, "age": age, "email": email},
-    )
-    if response.status_code == 200:
+    if send_change("PUT", f"/students/{id}", json={"id": id, "name": name, "age": age, "email": email}):
         st.success("Student updated successfully!")
     else:
         st.error("Failed to update student.")
 
 # Delete a student
 def delete_student(id):
-    response = requests.delete(f"{API_URL}/students/{id}")
-    if response.status_code == 200:
+    if send_change("DELETE", f"/students/{id}"):
         st.success("Student deleted successfully!")
     else:
         st.error("Failed to delete student.")
 
-# Generate student summary
+# Read the summary tokens from the Server-Sent Events stream as they arrive
+def read_summary_stream(response):
+    event = None
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data = json.loads(line[len("data:"):])
+            if event == "token":
+                yield data["token"]
+            elif event == "error":
+                yield data["error"]
+
+# Generate student summary, rendering it word by word while the model writes it
 def generate_summary(id):
-    response = requests.get(f"{API_URL}/students/{id}/summary")
-    if response.status_code == 200:
-        summary = response.json().get("summary", "No summary available.")
-        st.info(f"Summary for Student {id}: {summary}")
-    else:
+    try:
+        with get_session().get(
+            f"{API_URL}/students/{id}/summary/stream", stream=True, timeout=SUMMARY_TIMEOUT
+        ) as response:
+            if response.status_code == 200:
+                st.write(f"Summary for Student {id}:")
+                st.write_stream(read_summary_stream(response))
+            elif response.status_code == 429:
+                retry_after = response.headers.get("Retry-After", "a few")
+                st.warning(f"The summary service is busy. Please try again in {retry_after} seconds.")
+            else:
+                st.error("Failed to generate summary.")
+    except requests.RequestException:
         st.error("Failed to generate summary.")
 
 # Streamlit app layout
 st.title("Education Management System")
 
 # Display Students
+# The table is filled in at the end of the script, so it already reflects any change made further down this run
 st.header("Data Of Students")
 if st.button("Refresh Data"):
-    display_students()
+    fetch_students_page.clear()
+students_table = st.container()
 
 # Create Student
 st.header("Create a New Student")
@@ -191,7 +274,6 @@ with st.form("create_form"):
     submitted = st.form_submit_button("Create Student")
     if submitted:
         create_student(id, name, age, email)
-        display_students()
 
 # Get User by ID
 st.header("Get User by ID")
@@ -216,17 +298,19 @@ with st.form("update_form"):
     update_submitted = st.form_submit_button("Update Student")
     if update_submitted:
         update_student(update_id, update_name, update_age, update_email)
-        display_students()
 
 # Delete Student
 st.header("Delete a Student")
 delete_id = st.number_input("Student ID to Delete", min_value=1, step=1)
 if st.button("Delete Student"):
     delete_student(delete_id)
-    display_students()
 
 # Generate Summary
 st.header("Generate Student Summary")
 summary_id = st.number_input("Student ID for Summary", min_value=1, step=1)
 if st.button("Generate Summary"):
     generate_summary(summary_id)
+
+# Fill in the students table
+with students_table:
+    display_students()
@@ -0,0 +1,350 @@
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import httpx
+
+# A load-test harness for the FastAPI app in `Student_CRUD.py`. It replays a mix of recorded requests from a JSONL file
+# against the app at a fixed concurrency and reports, per endpoint, latency percentiles, requests per second and error
+# rate. Results are saved as JSON, and a previous results file can be passed with `--baseline` to compare runs.
+#
+# Each line of the requests file is one request: {"method": "GET", "path": "/students/{id}", "json": {...}}.
+# An optional "name" groups the request in the report; by default numeric path segments are replaced with "{id}".
+# Placeholders are filled in when a request is sent, anywhere in the path or body:
+# - "{id}": a random existing student ID between 1 and `--seed-students`.
+# - "{new_id}": a fresh student ID that has not been used yet, for creates.
+# - "{created_id}": an ID created earlier in this run through a "{new_id}" request, used once, for deletes. When no
+#   created ID is left, the request is skipped (not sent and not counted) rather than sent with an ID that does not
+#   exist, which would only measure 404s.
+#
+# With `--spawn`, the harness starts `fake_ollama.py` and the app with uvicorn on a temporary database, seeds it
+# with students and stops both afterwards, so a complete run is one command:
+#
+#     python benchmark.py --spawn --concurrency 32 --count 5000 --output bench.json
+#
+# With `--store-benchmark`, it instead measures the store backends directly, without HTTP: memory per record and
+# read throughput, encoding students the way the read routes used to and reading the stores' JSON bytes.
+#
+#     python benchmark.py --store-benchmark --records 200000
+
+NUMERIC_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+# `load_requests` reads the request mix from a JSONL file, skipping blank lines.
+def load_requests(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+# A helper function `endpoint_name` gives the name a request is reported under.
+def endpoint_name(request: dict) -> str:
+    path = request["path"].split("?", 1)[0]
+    return request.get("name") or f"{request['method'].upper()} {NUMERIC_SEGMENT.sub('/{id}', path)}"
+
+# A helper function `fill_placeholders` replaces the placeholders in a path or JSON body. `ids` maps each
+# placeholder to its value; a string that is exactly one placeholder becomes the integer itself.
+def fill_placeholders(value, ids: dict):
+    if isinstance(value, str):
+        if value in ids:
+            return ids[value]
+        for placeholder, number in ids.items():
+            value = value.replace(placeholder, str(number))
+        return value
+    if isinstance(value, dict):
+        return {key: fill_placeholders(item, ids) for key, item in value.items()}
+    if isinstance(value, list):
+        return [fill_placeholders(item, ids) for item in value]
+    return value
+
+# `percentile` returns the nearest-rank percentile of an already sorted list.
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+# `run_load` sends requests from the mix in order, cycling through it, with `concurrency` requests in flight,
+# until `count` requests were sent or `duration` seconds passed. It returns the latencies (seconds) and error
+# counts per endpoint, and the wall-clock time of the run.
+async def run_load(url: str, mix: list, concurrency: int, count, duration, seed_students: int, timeout: float):
+    rng = random.Random(0)
+    new_ids = itertools.count(10 ** 9)
+    requests_iter = itertools.cycle(mix)
+    if count is not None:
+        requests_iter = itertools.islice(requests_iter, count)
+    created_ids = []
+    latencies = {}
+    errors = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    started = time.perf_counter()
+    deadline = started + duration if duration is not None else None
+
+    async def worker(client: httpx.AsyncClient):
+        for request in requests_iter:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            raw = json.dumps(request)
+            if "{created_id}" in raw and not created_ids:
+                continue
+            new_id = next(new_ids)
+            ids = {"{id}": rng.randint(1, max(seed_students, 1)), "{new_id}": new_id}
+            if "{created_id}" in raw:
+                ids["{created_id}"] = created_ids.pop()
+            name = endpoint_name(request)
+            path = fill_placeholders(request["path"], ids)
+            body = fill_placeholders(request.get("json"), ids)
+            sent = time.perf_counter()
+            try:
+                response = await client.request(request["method"], path, json=body)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            if not failed and "{new_id}" in raw:
+                created_ids.append(new_id)
+            latencies.setdefault(name, []).append(time.perf_counter() - sent)
+            errors[name] = errors.get(name, 0) + failed
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+# `summarize_results` turns the raw latencies into the report saved as JSON.
+def summarize_results(latencies: dict, errors: dict, elapsed: float) -> dict:
+    endpoints = {}
+    all_latencies = []
+    for name, values in sorted(latencies.items()):
+        values.sort()
+        all_latencies.extend(values)
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": errors.get(name, 0),
+            "error_rate": errors.get(name, 0) / len(values),
+            "rps": len(values) / elapsed,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+        }
+    all_latencies.sort()
+    total_errors = sum(errors.values())
+    return {
+        "elapsed_s": elapsed,
+        "requests": len(all_latencies),
+        "errors": total_errors,
+        "error_rate": total_errors / len(all_latencies) if all_latencies else 0.0,
+        "rps": len(all_latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(all_latencies, 50) * 1000,
+        "p95_ms": percentile(all_latencies, 95) * 1000,
+        "p99_ms": percentile(all_latencies, 99) * 1000,
+        "endpoints": endpoints,
+    }
+
+# `print_report` prints one line per endpoint, with the change in p95 latency and throughput against a baseline.
+def print_report(results: dict, baseline=None) -> None:
+    header = f"{'endpoint':40} {'reqs':>7} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+    if baseline:
+        header += f" {'p95 chg':>8} {'rps chg':>8}"
+    print(header)
+    rows = list(results["endpoints"].items()) + [("TOTAL", results)]
+    base_rows = dict(baseline["endpoints"], TOTAL=baseline) if baseline else {}
+    for name, row in rows:
+        line = (f"{name:40} {row['requests']:>7} {row['rps']:>9.1f} {row['p50_ms']:>9.1f} "
+                f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['error_rate']:>7.1%}")
+        base = base_rows.get(name)
+        if base and base["p95_ms"] and base["rps"]:
+            line += f" {row['p95_ms'] / base['p95_ms'] - 1:>+8.1%} {row['rps'] / base['rps'] - 1:>+8.1%}"
+        print(line)
+
+# `wait_until_ready` polls a URL until the server answers, or fails after `timeout` seconds.
+def wait_until_ready(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start within {timeout} seconds")
+
+# `spawn_servers` starts the fake Ollama server and the app in subprocesses on a temporary database
+# and returns the processes so they can be stopped afterwards.
+def spawn_servers(args, workdir: str) -> list:
+    here = os.path.dirname(os.path.abspath(__file__))
+    ollama_port = args.port + 1
+    fake_env = dict(
+        os.environ,
+        FAKE_OLLAMA_TOKENS=str(args.tokens),
+        FAKE_OLLAMA_TOKENS_PER_SECOND=str(args.tokens_per_second),
+    )
+    app_env = dict(
+        os.environ,
+        STUDENT_STORE=args.store,
+        STUDENT_DB_PATH=os.path.join(workdir, "students.db"),
+        SUMMARY_JOBS_DB=os.path.join(workdir, "summary_jobs.db"),
+        OLLAMA_API_URL=f"http://127.0.0.1:{ollama_port}/api/chat",
+    )
+    uvicorn = [sys.executable, "-m", "uvicorn", "--host", "127.0.0.1", "--log-level", "warning"]
+    processes = [
+        subprocess.Popen(uvicorn + ["--port", str(ollama_port), "fake_ollama:app"], cwd=here, env=fake_env),
+        subprocess.Popen(
+            uvicorn + ["--port", str(args.port), "--workers", str(args.workers), "Student_CRUD:app"],
+            cwd=here,
+            env=app_env,
+        ),
+    ]
+    wait_until_ready(f"http://127.0.0.1:{ollama_port}/")
+    wait_until_ready(f"http://127.0.0.1:{args.port}/students?limit=1")
+    return processes
+
+# `seed_students` loads students 1..count through the bulk import endpoint so "{id}" requests hit real records.
+def seed_students(url: str, count: int) -> None:
+    lines = (
+        json.dumps({"id": i, "name": f"Student {i}", "age": 18 + i % 10, "email": f"student{i}@example.com"})
+        for i in range(1, count + 1)
+    )
+    response = httpx.post(f"{url}/students/bulk", content="\n".join(lines), timeout=300)
+    response.raise_for_status()
+
+# `benchmark_store` loads `records` students into a store and measures the Python heap it takes with tracemalloc
+# (the SQLite store keeps its rows in the database file and SQLite's own cache, which tracemalloc does not see).
+# It then times `reads` single-record reads and `reads` 100-record page reads two ways: "encode", a student encoded
+# through FastAPI's `jsonable_encoder` as the routes did before, and "json", the bytes from `get_json`/`page_json`.
+def benchmark_store(name: str, store, records: int, reads: int) -> dict:
+    from fastapi.encoders import jsonable_encoder
+
+    from models import Student
+
+    def encode(value) -> bytes:
+        return json.dumps(jsonable_encoder(value), separators=(",", ":")).encode()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for start in range(1, records + 1, 1000):
+        store.add_many([
+            Student(id=i, name=f"Student {i}", age=18 + i % 10, email=f"student{i}@example.com")
+            for i in range(start, min(start + 1000, records + 1))
+        ])
+    memory = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    rng = random.Random(0)
+    ids = [rng.randint(1, records) for _ in range(reads)]
+    cursors = [rng.randint(0, max(records - 100, 0)) for _ in range(reads)]
+    timings = {}
+    started = time.perf_counter()
+    for student_id in ids:
+        encode(store.get(student_id))
+    timings["get_encode_rps"] = reads / (time.perf_counter() - started)
+    started = time.perf_counter()
+    for student_id in ids:
+        store.get_json(student_id)
+    timings["get_json_rps"] = reads / (time.perf_counter() - started)
+    started = time.perf_counter()
+    for after_id in cursors:
+        encode(store.page(after_id, 100))
+    timings["page_encode_rps"] = reads / (time.perf_counter() - started)
+    started = time.perf_counter()
+    for after_id in cursors:
+        b"[" + b",".join(body for _, body in store.page_json(after_id, 100)) + b"]"
+    timings["page_json_rps"] = reads / (time.perf_counter() - started)
+    return {"store": name, "records": records, "bytes_per_record": memory / records, **timings}
+
+# `run_store_benchmark` runs `benchmark_store` for every backend and prints one line per backend.
+def run_store_benchmark(records: int, reads: int) -> dict:
+    from student_store import CompactStudentStore, MemoryStudentStore, SQLiteStudentStore
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        stores = [
+            ("memory", MemoryStudentStore()),
+            ("compact", CompactStudentStore()),
+            ("sqlite", SQLiteStudentStore(os.path.join(workdir, "students.db"))),
+        ]
+        for name, store in stores:
+            results.append(benchmark_store(name, store, records, reads))
+            store.close()
+            del store
+    print(f"{'store':10} {'bytes/rec':>10} {'get encode/s':>13} {'get json/s':>11} {'page encode/s':>14} {'page json/s':>12}")
+    for row in results:
+        print(f"{row['store']:10} {row['bytes_per_record']:>10.0f} {row['get_encode_rps']:>13.0f} "
+              f"{row['get_json_rps']:>11.0f} {row['page_encode_rps']:>14.0f} {row['page_json_rps']:>12.0f}")
+    return {"records": records, "reads": reads, "stores": results}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a request mix against the student API and report latency.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="base URL of the app")
+    parser.add_argument("--requests", default="benchmark_requests.jsonl", help="JSONL file with the request mix")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight at once")
+    parser.add_argument("--count", type=int, help="total number of requests to send")
+    parser.add_argument("--duration", type=float, help="seconds to run for (default 30 if --count is not given)")
+    parser.add_argument("--timeout", type=float, default=120, help="per-request timeout in seconds")
+    parser.add_argument("--seed-students", type=int, default=1000, help="students to create before the run")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--spawn", action="store_true", help="start fake Ollama and the app on a temporary database")
+    parser.add_argument("--port", type=int, default=8765, help="app port with --spawn (fake Ollama uses port + 1)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers with --spawn")
+    parser.add_argument("--tokens", type=int, default=100, help="fake Ollama tokens per summary with --spawn")
+    parser.add_argument("--tokens-per-second", type=float, default=50, help="fake Ollama token rate with --spawn")
+    parser.add_argument("--store", default="sqlite", help="STUDENT_STORE backend of the app with --spawn")
+    parser.add_argument("--store-benchmark", action="store_true", help="measure the store backends instead")
+    parser.add_argument("--records", type=int, default=100000, help="students loaded with --store-benchmark")
+    parser.add_argument("--reads", type=int, default=20000, help="reads timed per case with --store-benchmark")
+    args = parser.parse_args()
+    if args.store_benchmark:
+        results = run_store_benchmark(args.records, args.reads)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+        return
+    if args.count is None and args.duration is None:
+        args.duration = 30
+
+    mix = load_requests(args.requests)
+    processes = []
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            if args.spawn:
+                processes = spawn_servers(args, workdir)
+                args.url = f"http://127.0.0.1:{args.port}"
+            if args.seed_students:
+                seed_students(args.url, args.seed_students)
+            latencies, errors, elapsed = asyncio.run(run_load(
+                args.url, mix, args.concurrency, args.count, args.duration, args.seed_students, args.timeout
+            ))
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait()
+
+    results = summarize_results(latencies, errors, elapsed)
+    results["config"] = {
+        "url": args.url,
+        "requests_file": args.requests,
+        "concurrency": args.concurrency,
+        "seed_students": args.seed_students,
+        "spawn": args.spawn,
+        "store": args.store,
+        "workers": args.workers,
+        "tokens": args.tokens,
+        "tokens_per_second": args.tokens_per_second,
+        "timestamp": time.time(),
+    }
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
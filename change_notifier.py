@@ -0,0 +1,37 @@
+import asyncio
+
+# `ChangeNotifier` wakes the long-polls of `GET /students/changes` as soon as this process changes a student, instead
+# of each waiting client re-reading the change log on a timer. The store calls `notify` from whichever thread made the
+# change; the wake-up is handed to the event loop, which sets the current event and starts a new one for the next
+# change. A waiter takes the current event with `event` before it reads the change log, so a change committed after
+# that read still wakes it. Changes made by other worker processes are not seen here, so waiters also re-check the
+# log on a timer as a fallback.
+class ChangeNotifier:
+    def __init__(self):
+        self._loop = None
+        self._event = None
+
+    # `event` returns the event set by the next change. It must be called from the event loop thread.
+    def event(self) -> asyncio.Event:
+        self._loop = asyncio.get_running_loop()
+        if self._event is None:
+            self._event = asyncio.Event()
+        return self._event
+
+    # `wait` waits until `event` is set or `timeout` seconds passed.
+    async def wait(self, event: asyncio.Event, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    # `notify` may be called from any thread.
+    def notify(self) -> None:
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self) -> None:
+        if self._event is not None:
+            self._event.set()
+            self._event = None
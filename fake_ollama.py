@@ -0,0 +1,54 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+# A stand-in for the Ollama chat API used for load tests and benchmarks, so the app can be measured without a GPU.
+# `POST /api/chat` streams a fixed number of tokens in Ollama's NDJSON format at a configurable rate. Settings come
+# from environment variables so the server can be started with uvicorn directly:
+#
+#     FAKE_OLLAMA_TOKENS_PER_SECOND=50 uvicorn fake_ollama:app --port 11434
+#
+# - `FAKE_OLLAMA_TOKENS`: tokens per response (default 100).
+# - `FAKE_OLLAMA_TOKENS_PER_SECOND`: streaming rate (default 50).
+# - `FAKE_OLLAMA_FIRST_TOKEN_DELAY`: seconds before the first token, like prompt processing (default 0.2).
+TOKENS = int(os.environ.get("FAKE_OLLAMA_TOKENS", "100"))
+TOKENS_PER_SECOND = float(os.environ.get("FAKE_OLLAMA_TOKENS_PER_SECOND", "50"))
+FIRST_TOKEN_DELAY = float(os.environ.get("FAKE_OLLAMA_FIRST_TOKEN_DELAY", "0.2"))
+
+app = FastAPI()
+
+# A generator `generate_tokens` produces the streamed chat messages followed by the final `done` message.
+async def generate_tokens(model: str):
+    started = time.perf_counter()
+    await asyncio.sleep(FIRST_TOKEN_DELAY)
+    for i in range(TOKENS):
+        message = {"role": "assistant", "content": f"token{i} "}
+        yield json.dumps({"model": model, "message": message, "done": False}) + "\n"
+        await asyncio.sleep(1 / TOKENS_PER_SECOND)
+    duration_ns = int((time.perf_counter() - started) * 1e9)
+    yield json.dumps({"model": model, "done": True, "eval_count": TOKENS, "total_duration": duration_ns}) + "\n"
+
+@app.post("/api/chat")
+async def chat(request: Request):
+    payload = await request.json()
+    return StreamingResponse(generate_tokens(payload.get("model", "fake")), media_type="application/x-ndjson")
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a fake Ollama chat server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--tokens", type=int, default=TOKENS)
+    parser.add_argument("--tokens-per-second", type=float, default=TOKENS_PER_SECOND)
+    parser.add_argument("--first-token-delay", type=float, default=FIRST_TOKEN_DELAY)
+    args = parser.parse_args()
+    TOKENS = args.tokens
+    TOKENS_PER_SECOND = args.tokens_per_second
+    FIRST_TOKEN_DELAY = args.first_token_delay
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,188 @@
+import bisect
+import threading
+import time
+
+# Lightweight metrics in the Prometheus text exposition format, served by `GET /metrics`. Each instrument keeps its
+# values per label combination behind a lock, so recording a value costs a dictionary lookup and a few additions and
+# can stay enabled permanently. Metrics are kept per process; with several uvicorn workers each worker reports its own.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# A helper function `format_labels` renders a label set such as {route="/students",method="GET"}.
+def format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+# `Metric` is the base of every instrument: a name, help text, label names, and values per label combination.
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            lines.append(f"{self.name}{format_labels(self.labelnames, key)} {value}")
+        return lines
+
+# `Counter` only goes up, for example the number of upstream errors.
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+# `Gauge` goes up and down, for example the number of requests in flight.
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+# `CallbackMetric` reads its value from a function when the metrics are scraped, for values such as the store size
+# that are cheaper to compute on demand than to track on every change, or counters another object already keeps.
+class CallbackMetric(Metric):
+    def __init__(self, name: str, help_text: str, callback, kind: str = "gauge"):
+        super().__init__(name, help_text)
+        self.callback = callback
+        self.kind = kind
+
+    def render(self) -> list:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}", f"{self.name} {self.callback()}"]
+
+# `Histogram` counts observations into cumulative buckets and keeps their sum, from which Prometheus computes
+# latency percentiles.
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            values = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{format_labels(self.labelnames, key, le)} {cumulative}")
+            cumulative += counts[-1]
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+# `Registry` collects the instruments and renders them all for `GET /metrics`.
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Time to handle an HTTP request.", ("method", "route", "status")
+))
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled.", ("method",)
+))
+
+OLLAMA_TIME_TO_FIRST_TOKEN = REGISTRY.register(Histogram(
+    "ollama_time_to_first_token_seconds", "Time from sending a chat request to Ollama until the first token."
+))
+OLLAMA_GENERATION_DURATION = REGISTRY.register(Histogram(
+    "ollama_generation_duration_seconds", "Time from sending a chat request to Ollama until the response is done."
+))
+OLLAMA_TOKENS_PER_SECOND = REGISTRY.register(Histogram(
+    "ollama_tokens_per_second", "Generation speed of completed Ollama responses.",
+    buckets=(1, 2, 5, 10, 20, 30, 50, 75, 100, 200, 500),
+))
+OLLAMA_TOKENS = REGISTRY.register(Counter("ollama_tokens_total", "Tokens generated by Ollama."))
+OLLAMA_ERRORS = REGISTRY.register(Counter(
+    "ollama_errors_total", "Failed Ollama chat requests, by kind of failure.", ("kind",)
+))
+OLLAMA_IN_FLIGHT = REGISTRY.register(Gauge("ollama_requests_in_flight", "Ollama chat requests currently streaming."))
+SUMMARY_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "summary_queue_wait_seconds", "Time summary requests waited for a generation slot.", ("priority",)
+))
+
+# `MetricsMiddleware` is a plain ASGI middleware that times every HTTP request and counts requests in flight. The route
+# label is the matched route template (for example /students/{student_id}), not the raw path, so the number of label
+# combinations stays small. For streaming responses the time includes streaming the whole body.
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc(method=method)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec(method=method)
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started,
+                method=method,
+                route=route.path if route is not None else "unmatched",
+                status=status,
+            )
@@ -0,0 +1,26 @@
+from typing import Annotated, List, Optional
+
+from pydantic import BaseModel, EmailStr, Field
+
+# SQLite stores integers as signed 64-bit values, so IDs, ages and the IDs used in queries are limited to that range.
+# Larger values are rejected with a 422 validation error instead of failing inside the store.
+MIN_STORED_INT = -(2 ** 63)
+MAX_STORED_INT = 2 ** 63 - 1
+StoredInt = Annotated[int, Field(ge=MIN_STORED_INT, le=MAX_STORED_INT)]
+
+# A Pydantic model `Student` is created to define the structure of the student data. 
+# This model enforces validation rules for the incoming data, such as checking the type and format of fields like `id`, 
+# `name`, `age`, and `email`. It lives in its own module so the storage layer and the API can share it.
+class Student(BaseModel):
+    id: StoredInt
+    name: str
+    age: StoredInt
+    email: EmailStr
+
+# `SummaryJobRequest` describes a bulk summary job: either an explicit list of student `ids`, or a filter
+# on age range and name prefix that selects the students from the database.
+class SummaryJobRequest(BaseModel):
+    ids: Optional[List[StoredInt]] = None
+    min_age: Optional[StoredInt] = None
+    max_age: Optional[StoredInt] = None
+    name_prefix: Optional[str] = None
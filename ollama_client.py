@@ -0,0 +1,141 @@
+import asyncio
+import json
+import time
+
+import httpx
+
+from metrics import (
+    OLLAMA_ERRORS,
+    OLLAMA_GENERATION_DURATION,
+    OLLAMA_IN_FLIGHT,
+    OLLAMA_TIME_TO_FIRST_TOKEN,
+    OLLAMA_TOKENS,
+    OLLAMA_TOKENS_PER_SECOND,
+)
+
+# `OllamaError` is raised when no summary could be generated. Its message is the text
+# shown to the user in place of the summary, and failed generations are never cached.
+class OllamaError(Exception):
+    pass
+
+# `OllamaClient` talks to the Ollama chat API asynchronously. It keeps one `httpx.AsyncClient` with a persistent
+# connection pool for the life of the app instead of opening a new connection per summary, and applies separate
+# connect and read timeouts so a stalled model cannot hold a request forever. The read timeout applies between
+# streamed chunks, not to the whole generation.
+class OllamaClient:
+    def __init__(self, url: str, model: str, connect_timeout: float = 5.0, read_timeout: float = 120.0,
+                 max_connections: int = 20):
+        self.url = url
+        self.model = model
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._client = None
+
+    # The underlying client is created on first use so that it is bound to the running event loop.
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # `stream_chat` sends the prompt to Ollama and yields the content of each streamed message as it arrives.
+    # Closing the generator early closes the HTTP response, which aborts the generation upstream. Each call records
+    # time to first token, and for completed responses the total time and generation speed; failures are counted
+    # by kind in `ollama_errors_total`.
+    async def stream_chat(self, prompt: str):
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": True
+        }
+        started = time.perf_counter()
+        first_token = None
+        tokens = 0
+        OLLAMA_IN_FLIGHT.inc()
+        try:
+            async with self._get_client().stream("POST", self.url, json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    body = json.loads(line)
+                    if "error" in body:
+                        OLLAMA_ERRORS.inc(kind="upstream")
+                        raise OllamaError(body["error"])
+                    if body.get("done", False):
+                        record_generation(body, started, first_token, tokens)
+                        return
+                    content = body.get("message", {}).get("content", "")
+                    if content:
+                        if first_token is None:
+                            first_token = time.perf_counter()
+                            OLLAMA_TIME_TO_FIRST_TOKEN.observe(first_token - started)
+                        tokens += 1
+                        yield content
+        except httpx.TimeoutException as e:
+            print(f"Timeout: {e!r}")
+            OLLAMA_ERRORS.inc(kind="timeout")
+            raise OllamaError("Summary generation timed out")
+        except httpx.HTTPError as e:
+            print(f"Error: {e!r}")
+            OLLAMA_ERRORS.inc(kind="http")
+            raise OllamaError("Error generating summary")
+        except ValueError as ve:
+            print(f"JSON Parsing Error: {ve}")
+            OLLAMA_ERRORS.inc(kind="parse")
+            raise OllamaError("Error parsing response")
+        finally:
+            OLLAMA_IN_FLIGHT.dec()
+        OLLAMA_ERRORS.inc(kind="incomplete")
+        raise OllamaError("Response still being processed.")
+
+    # `chat` collects the streamed content into the complete response text.
+    async def chat(self, prompt: str) -> str:
+        parts = []
+        async for content in self.stream_chat(prompt):
+            parts.append(content)
+        return "".join(parts)
+
+# A helper function `record_generation` records a completed response. The token count and generation time come from
+# Ollama's final message (`eval_count`, `eval_duration` in nanoseconds) when it reports them; otherwise streamed
+# messages are counted and timed from the first token, so prompt processing is not counted as generation.
+def record_generation(body: dict, started: float, first_token, tokens: int) -> None:
+    finished = time.perf_counter()
+    OLLAMA_GENERATION_DURATION.observe(finished - started)
+    tokens = body.get("eval_count") or tokens
+    OLLAMA_TOKENS.inc(tokens)
+    if body.get("eval_duration"):
+        seconds = body["eval_duration"] / 1e9
+    else:
+        seconds = finished - (first_token if first_token is not None else started)
+    if tokens and seconds > 0:
+        OLLAMA_TOKENS_PER_SECOND.observe(tokens / seconds)
+
+# `SingleFlight` de-duplicates concurrent work by key: while a call for a key is running, later callers with the
+# same key wait for that call's result instead of starting their own. The shared task is shielded, so a caller
+# that goes away (for example a disconnected client) does not cancel the work for everyone else.
+class SingleFlight:
+    def __init__(self):
+        self._tasks = {}
+
+    async def do(self, key, func):
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Retrieve the exception so an abandoned failed task is not reported as never retrieved.
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._tasks)
@@ -0,0 +1,133 @@
+import gzip
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# zstd is optional: it is used when the `zstandard` package is installed, or on Python 3.14+ where the standard
+# library has `compression.zstd`. Without either, responses are compressed with gzip only.
+try:
+    import zstandard
+
+    def zstd_compress(data: bytes) -> bytes:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+except ImportError:
+    try:
+        from compression import zstd
+
+        def zstd_compress(data: bytes) -> bytes:
+            return zstd.compress(data, level=ZSTD_LEVEL)
+    except ImportError:
+        zstd_compress = None
+
+# Content types worth compressing. Server-Sent Events are excluded on purpose: they are streamed and must reach the
+# client event by event.
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/plain", "text/csv", "text/html")
+
+# A helper function `accepted_encodings` returns the content codings the client accepts, from its
+# `Accept-Encoding` header, leaving out any it refuses with `q=0`.
+def accepted_encodings(header: str) -> set:
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        try:
+            refused = params.startswith("q=") and float(params[2:]) == 0
+        except ValueError:
+            refused = False
+        if coding and not refused:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+# A helper function `choose_encoding` picks zstd when it is available and accepted, otherwise gzip, or None.
+def choose_encoding(header: str):
+    accepted = accepted_encodings(header)
+    if zstd_compress is not None and ("zstd" in accepted or "*" in accepted):
+        return "zstd"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+# `CompressionMiddleware` is a plain ASGI middleware that compresses response bodies with zstd or gzip, as negotiated
+# through `Accept-Encoding`. Only responses sent as a single body of a compressible type and at least `minimum_size`
+# bytes long are compressed. Streamed responses (NDJSON and CSV exports, Server-Sent Events) pass through untouched so
+# they keep arriving chunk by chunk. A strong ETag gets the coding appended (`"abc"` becomes `"abc-gzip"`), because
+# the compressed bytes are a different representation; `strip_etag_encoding` undoes this when checking `If-None-Match`,
+# and a 304 answering such a check gets the same suffix and `Vary` header back.
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = dict(scope["headers"])
+        encoding = choose_encoding(request_headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+            held, start = start, None
+            body = message.get("body", b"")
+            headers = [(name.lower(), value) for name, value in held["headers"]]
+            header_map = dict(headers)
+            if held["status"] == 304:
+                # A 304 must carry the ETag and Vary of the 200 it revalidates. Whether that 200 was compressed
+                # depends on its size, which is unknown here, so the suffix is kept when the client's own
+                # `If-None-Match` carries it.
+                headers = add_vary(headers)
+                etag = header_map.get(b"etag")
+                if etag is not None and etag.endswith(b'"'):
+                    encoded = etag[:-1] + b"-" + encoding.encode() + b'"'
+                    if encoded in request_headers.get(b"if-none-match", b""):
+                        headers = [(name, value) for name, value in headers if name != b"etag"] + [(b"etag", encoded)]
+                await send(dict(held, headers=headers))
+                await send(message)
+                return
+            eligible = (
+                not message.get("more_body", False)
+                and b"content-encoding" not in header_map
+                and header_map.get(b"content-type", b"").decode("latin-1").startswith(COMPRESSIBLE_TYPES)
+            )
+            if eligible:
+                headers = add_vary(headers)
+            if eligible and len(body) >= self.minimum_size:
+                body = zstd_compress(body) if encoding == "zstd" else gzip.compress(body, compresslevel=GZIP_LEVEL)
+                headers = [(name, value) for name, value in headers if name not in (b"content-length", b"etag")]
+                headers += [(b"content-encoding", encoding.encode()), (b"content-length", str(len(body)).encode())]
+                etag = header_map.get(b"etag")
+                if etag is not None and etag.endswith(b'"'):
+                    headers.append((b"etag", etag[:-1] + b"-" + encoding.encode() + b'"'))
+                message = dict(message, body=body)
+            await send(dict(held, headers=headers))
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+# A helper function `add_vary` adds `Accept-Encoding` to the `Vary` header, so caches keep compressed and
+# uncompressed responses apart.
+def add_vary(headers: list) -> list:
+    for index, (name, value) in enumerate(headers):
+        if name == b"vary":
+            headers[index] = (name, value + b", Accept-Encoding")
+            return headers
+    return headers + [(b"vary", b"Accept-Encoding")]
+
+# A helper function `strip_etag_encoding` removes the coding that `CompressionMiddleware` appended to an entity tag.
+def strip_etag_encoding(etag: str) -> str:
+    for coding in ("-gzip", "-zstd"):
+        if etag.endswith(coding + '"'):
+            return etag[:-len(coding) - 1] + '"'
+    return etag
@@ -0,0 +1,149 @@
+import csv
+import io
+import json
+
+from pydantic import ValidationError
+
+from models import Student
+from student_store import StoreError
+
+# Bulk import and export of students in CSV or NDJSON. Imports are read from a file object one row at a time and
+# committed in batches, so memory use does not depend on the size of the upload. CSV files must have a header row
+# with the columns below.
+CSV_FIELDS = ["id", "name", "age", "email"]
+
+# A helper function `decode_line` decodes one line of an upload, skipping a byte order mark on the first line.
+def decode_line(raw: bytes, line_number: int) -> str:
+    return raw.decode("utf-8-sig" if line_number == 1 else "utf-8")
+
+# A generator `decode_lines` decodes an upload line by line, keeping the line endings for the `csv` module.
+def decode_lines(binary_file):
+    for line_number, raw in enumerate(binary_file, start=1):
+        yield decode_line(raw, line_number)
+
+# A generator `read_rows` yields `(line, row, error)` for every record of an uploaded file, where `row` is a dict
+# of raw field values, or None together with an `error` message if the record could not be parsed.
+# A leading UTF-8 byte order mark, as Excel writes when saving "CSV UTF-8", is skipped.
+# Lines are decoded one at a time. An NDJSON line that is not valid UTF-8 is an error for that line only. In a CSV
+# file, where a quoted field may span lines, such a line or a record the `csv` module cannot parse ends the file with
+# an error at that line; the rows before it are still imported and reported as usual.
+def read_rows(binary_file, fmt: str):
+    if fmt == "csv":
+        reader = csv.DictReader(decode_lines(binary_file))
+        try:
+            for row in reader:
+                yield reader.line_num, row, None
+        except UnicodeDecodeError:
+            yield reader.reader.line_num + 1, None, "Line is not valid UTF-8; the rest of the file was not read."
+        except csv.Error as e:
+            yield reader.reader.line_num, None, f"Invalid CSV ({e}); the rest of the file was not read."
+        return
+    for line_number, raw in enumerate(binary_file, start=1):
+        try:
+            line = decode_line(raw, line_number)
+        except UnicodeDecodeError:
+            yield line_number, None, "Line is not valid UTF-8."
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, None, "Invalid JSON."
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, "Expected a JSON object."
+            continue
+        yield line_number, row, None
+
+# A helper function `format_validation_error` turns a Pydantic validation error into a short message per field.
+def format_validation_error(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in error.errors())
+
+# `BulkImport` validates and commits one batch at a time. Each row is validated with the `Student` model (which also
+# normalizes the email), checked for duplicate IDs and emails within the batch, and then the whole batch is checked
+# against the store with a single lookup. A batch is committed all-or-nothing: if any row in it fails, none of its
+# rows are inserted and the failing rows are reported. At most `max_errors` row errors are kept in the report.
+class BulkImport:
+    def __init__(self, store, batch_size: int = 500, max_errors: int = 1000):
+        self.store = store
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.inserted = 0
+        self.rejected_rows = 0
+        self.rejected_batches = 0
+        self.error_count = 0
+        self.errors = []
+
+    def _error(self, line: int, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "error": message})
+
+    def run(self, rows) -> dict:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == self.batch_size:
+                self._commit(batch)
+                batch = []
+        if batch:
+            self._commit(batch)
+        return {
+            "inserted": self.inserted,
+            "rejected_rows": self.rejected_rows,
+            "rejected_batches": self.rejected_batches,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+    def _commit(self, batch: list) -> None:
+        students = []
+        errors_before = self.error_count
+        seen_ids = set()
+        seen_emails = set()
+        for line, row, error in batch:
+            if error is not None:
+                self._error(line, error)
+                continue
+            try:
+                student = Student.model_validate(row)
+            except ValidationError as e:
+                self._error(line, format_validation_error(e))
+                continue
+            if student.id in seen_ids:
+                self._error(line, "Duplicate ID in this batch.")
+            elif student.email in seen_emails:
+                self._error(line, "Duplicate email in this batch.")
+            else:
+                seen_ids.add(student.id)
+                seen_emails.add(student.email)
+                students.append((line, student))
+
+        existing_ids, existing_emails = self.store.find_existing(seen_ids, seen_emails)
+        for line, student in students:
+            if student.id in existing_ids:
+                self._error(line, "Student with this ID already exists.")
+            elif student.email in existing_emails:
+                self._error(line, "Student with this email already exists.")
+
+        if self.error_count == errors_before:
+            try:
+                self.store.add_many([student for _, student in students])
+            except StoreError:
+                # Another writer inserted a clashing student after the lookup above.
+                self._error(batch[0][0], "Batch conflicts with concurrent changes.")
+            else:
+                self.inserted += len(students)
+                return
+        self.rejected_batches += 1
+        self.rejected_rows += len(batch)
+
+# A helper function `encode_csv` encodes a chunk of students as CSV text, optionally preceded by the header row.
+def encode_csv(students: list, header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(CSV_FIELDS)
+    writer.writerows((student.id, student.name, student.age, student.email) for student in students)
+    return buffer.getvalue()
@@ -0,0 +1,707 @@
+import bisect
+import heapq
+import itertools
+import os
+import secrets
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+
+from models import Student
+
+# The storage layer sits behind the CRUD routes in `Student_CRUD.py`. Every backend implements the same small
+# repository interface (`add`, `add_many`, `find_existing`, `get`, `update`, `delete`, `list_all`, `page`, `search`,
+# `count`, `revision`, `changes`) so the routes never touch the underlying data structures directly, and uniqueness
+# of IDs and emails is enforced by the store itself.
+#
+# Every insert, update and delete is given the next revision number and recorded in a bounded change log, so clients
+# can sync incrementally. A change is a dict with `revision`, `op` (`insert`, `update` or `delete`), `id` and
+# `student` (the new record, or None for a delete).
+# Revisions only make sense together with the store's epoch, a random token chosen when the revision sequence starts
+# (a new in-memory store, or a new database file). A client that kept a revision from another epoch must reload.
+
+# Store errors are raised by the repository and translated into HTTP errors by the routes.
+class StoreError(Exception):
+    pass
+
+class DuplicateIdError(StoreError):
+    pass
+
+class DuplicateEmailError(StoreError):
+    pass
+
+class StudentNotFoundError(StoreError):
+    pass
+
+# `ChangesUnavailableError` is raised when the change log no longer reaches back to the requested revision, or the
+# revision is newer than the store's own (it comes from an earlier epoch), in which case the client has to reload
+# the full table.
+class ChangesUnavailableError(StoreError):
+    pass
+
+# `StudentStore` is the abstract base class every backend derives from. It mostly documents the interface. Every
+# abstract method must be provided by the concrete backend, so a backend missing one fails as soon as it is
+# constructed; `get_json` and `page_json` have defaults that encode the result of `get` and `page`.
+class StudentStore(ABC):
+    def __init__(self):
+        self._subscribers = []
+
+    # `subscribe` registers `callback`, called without arguments from the writing thread after each add, add_many,
+    # update or delete committed through this store object. Changes made by other processes are not reported.
+    def subscribe(self, callback) -> None:
+        self._subscribers.append(callback)
+
+    def _notify(self) -> None:
+        for callback in self._subscribers:
+            callback()
+
+    @abstractmethod
+    def add(self, student: Student) -> Student:
+        raise NotImplementedError
+
+    # `add_many` inserts a batch of students all-or-nothing: if any of them clashes with an existing ID or email
+    # (or with another student in the batch), none are inserted.
+    @abstractmethod
+    def add_many(self, students: list) -> None:
+        raise NotImplementedError
+
+    # `find_existing` returns the subsets of the given IDs and emails that are already in the store.
+    @abstractmethod
+    def find_existing(self, ids, emails) -> tuple:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, student_id: int):
+        raise NotImplementedError
+
+    # `get_json` returns the student encoded as JSON bytes, or None if it does not exist. The read routes send these
+    # bytes as the response body, so a backend that keeps records already encoded can skip encoding altogether.
+    def get_json(self, student_id: int):
+        student = self.get(student_id)
+        return student.model_dump_json().encode() if student is not None else None
+
+    @abstractmethod
+    def update(self, student_id: int, student: Student) -> Student:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, student_id: int) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_all(self) -> list:
+        raise NotImplementedError
+
+    # `page` returns up to `limit` students ordered by ID, starting after `after_id` (keyset pagination).
+    @abstractmethod
+    def page(self, after_id, limit: int) -> list:
+        raise NotImplementedError
+
+    # `page_json` is `page` with each student returned as an `(id, JSON bytes)` pair.
+    def page_json(self, after_id, limit: int) -> list:
+        return [(student.id, student.model_dump_json().encode()) for student in self.page(after_id, limit)]
+
+    # `search` returns up to `limit` students ordered by ID, after `after_id`, that match every given criterion:
+    # an inclusive age range, a case-insensitive name prefix or substring, and an exact email. Each criterion is
+    # answered from a secondary index maintained by the backend, so queries do not scan the whole table.
+    @abstractmethod
+    def search(self, min_age=None, max_age=None, name_prefix=None, name_contains=None, email=None,
+               after_id=None, limit: int = 100) -> list:
+        raise NotImplementedError
+
+    @abstractmethod
+    def count(self) -> int:
+        raise NotImplementedError
+
+    # `revision` returns the revision of the latest change (0 before the first one).
+    @abstractmethod
+    def revision(self) -> int:
+        raise NotImplementedError
+
+    # `epoch` returns the token identifying this store's revision sequence.
+    @abstractmethod
+    def epoch(self) -> str:
+        raise NotImplementedError
+
+    # `changes` returns up to `limit` changes made after revision `since`, oldest first.
+    @abstractmethod
+    def changes(self, since: int, limit: int) -> list:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+# A helper function `make_change` builds the change log entry of one mutation.
+def make_change(revision: int, op: str, student_id: int, student) -> dict:
+    return {
+        "revision": revision,
+        "op": op,
+        "id": student_id,
+        "student": student.model_dump() if student is not None else None,
+    }
+
+# A helper function `name_trigrams` returns the set of lower-cased three-character substrings of a name,
+# which the in-memory name substring index is keyed on.
+def name_trigrams(name: str) -> set:
+    name = name.lower()
+    return {name[i:i + 3] for i in range(len(name) - 2)}
+
+# `MemoryStudentStore` keeps the original in-memory behaviour: a dictionary of students keyed by ID and an
+# email -> ID map used to enforce unique emails. Sorted lists of IDs, (age, ID) and (lower-cased name, ID) pairs
+# serve keyset pagination, age ranges and name prefixes with binary search, and a trigram -> IDs map serves name
+# substrings. Data is lost on restart and is private to one process, so it is only suitable for development and
+# tests. A lock guards the structures because sync routes run concurrently in FastAPI's threadpool.
+# The change log is a deque holding the last `change_log_size` changes.
+class MemoryStudentStore(StudentStore):
+    def __init__(self, change_log_size: int = 10000):
+        super().__init__()
+        self._epoch = secrets.token_hex(8)
+        self._revision = 0
+        self._changes = deque(maxlen=change_log_size)
+        self.students = {}
+        self.emails = {}
+        self._ids = []
+        self._ages = []
+        self._names = []
+        self._trigrams = {}
+        self._lock = threading.Lock()
+
+    # `_index` and `_unindex` keep every secondary index in step with the `students` dictionary.
+    def _index(self, student: Student) -> None:
+        self.students[student.id] = student
+        self.emails[student.email] = student.id
+        bisect.insort(self._ids, student.id)
+        bisect.insort(self._ages, (student.age, student.id))
+        bisect.insort(self._names, (student.name.lower(), student.id))
+        for trigram in name_trigrams(student.name):
+            self._trigrams.setdefault(trigram, set()).add(student.id)
+
+    def _unindex(self, student: Student) -> None:
+        del self.students[student.id]
+        del self.emails[student.email]
+        del self._ids[bisect.bisect_left(self._ids, student.id)]
+        del self._ages[bisect.bisect_left(self._ages, (student.age, student.id))]
+        del self._names[bisect.bisect_left(self._names, (student.name.lower(), student.id))]
+        for trigram in name_trigrams(student.name):
+            ids = self._trigrams[trigram]
+            ids.discard(student.id)
+            if not ids:
+                del self._trigrams[trigram]
+
+    def _record(self, op: str, student_id: int, student) -> None:
+        self._revision += 1
+        self._changes.append(make_change(self._revision, op, student_id, student))
+
+    def add(self, student: Student) -> Student:
+        with self._lock:
+            if student.id in self.students:
+                raise DuplicateIdError(student.id)
+            if student.email in self.emails:
+                raise DuplicateEmailError(student.email)
+            self._index(student)
+            self._record("insert", student.id, student)
+        self._notify()
+        return student
+
+    def add_many(self, students: list) -> None:
+        with self._lock:
+            batch_ids = set()
+            batch_emails = set()
+            for student in students:
+                if student.id in self.students or student.id in batch_ids:
+                    raise DuplicateIdError(student.id)
+                if student.email in self.emails or student.email in batch_emails:
+                    raise DuplicateEmailError(student.email)
+                batch_ids.add(student.id)
+                batch_emails.add(student.email)
+            for student in students:
+                self._index(student)
+                self._record("insert", student.id, student)
+        self._notify()
+
+    def find_existing(self, ids, emails) -> tuple:
+        with self._lock:
+            return (
+                {student_id for student_id in ids if student_id in self.students},
+                {email for email in emails if email in self.emails},
+            )
+
+    def get(self, student_id: int):
+        return self.students.get(student_id)
+
+    def update(self, student_id: int, student: Student) -> Student:
+        with self._lock:
+            current = self.students.get(student_id)
+            if current is None:
+                raise StudentNotFoundError(student_id)
+            if student.email != current.email and student.email in self.emails:
+                raise DuplicateEmailError(student.email)
+            updated = student.model_copy(update={"id": student_id})
+            self._unindex(current)
+            self._index(updated)
+            self._record("update", student_id, updated)
+        self._notify()
+        return updated
+
+    def delete(self, student_id: int) -> None:
+        with self._lock:
+            current = self.students.get(student_id)
+            if current is None:
+                raise StudentNotFoundError(student_id)
+            self._unindex(current)
+            self._record("delete", student_id, None)
+        self._notify()
+
+    def list_all(self) -> list:
+        with self._lock:
+            return list(self.students.values())
+
+    def page(self, after_id, limit: int) -> list:
+        with self._lock:
+            start = 0 if after_id is None else bisect.bisect_right(self._ids, after_id)
+            return [self.students[i] for i in self._ids[start:start + limit]]
+
+    # Each index gives the number of students matching its criterion with a binary search, and its slice is read by
+    # position, without copying anything.
+    # The query is then answered the cheaper of two ways, estimated from the smallest of these counts:
+    # - walk the students in ID order from `after_id`, stopping after `limit` matches, which is fast when matches are
+    #   common (about `limit * count() / smallest` students are looked at);
+    # - or check only the students in the smallest index slice and keep the `limit` lowest IDs, which is fast when
+    #   matches are rare.
+    # Either way a page costs at most about the square root of `limit * count()`. Every candidate is checked against
+    # all criteria, which also covers substrings shorter than a trigram.
+    def search(self, min_age=None, max_age=None, name_prefix=None, name_contains=None, email=None,
+               after_id=None, limit: int = 100) -> list:
+        prefix = name_prefix.lower() if name_prefix is not None else None
+        contains = name_contains.lower() if name_contains is not None else None
+
+        def matches(student) -> bool:
+            return (
+                (email is None or student.email == email)
+                and (min_age is None or student.age >= min_age)
+                and (max_age is None or student.age <= max_age)
+                and (prefix is None or student.name.lower().startswith(prefix))
+                and (contains is None or contains in student.name.lower())
+            )
+
+        with self._lock:
+            # Each slice is (number of students, function returning their IDs in any order).
+            slices = []
+            if email is not None:
+                ids = [self.emails[email]] if email in self.emails else []
+                slices.append((len(ids), lambda: ids))
+            if min_age is not None or max_age is not None:
+                low = 0 if min_age is None else bisect.bisect_left(self._ages, (min_age, float("-inf")))
+                high = len(self._ages) if max_age is None else bisect.bisect_right(self._ages, (max_age, float("inf")))
+                slices.append((high - low, lambda: (self._ages[k][1] for k in range(low, high))))
+            if prefix is not None:
+                low_name = bisect.bisect_left(self._names, (prefix,))
+                high_name = bisect.bisect_left(self._names, (prefix + "\U0010ffff",))
+                slices.append((high_name - low_name, lambda: (self._names[k][1] for k in range(low_name, high_name))))
+            if contains is not None and len(contains) >= 3:
+                sets = [self._trigrams.get(trigram, ()) for trigram in name_trigrams(contains)]
+                smallest_set = min(sets, key=len)
+                slices.append((len(smallest_set), lambda: smallest_set))
+
+            start = 0 if after_id is None else bisect.bisect_right(self._ids, after_id)
+            size, slice_ids = min(slices, key=lambda entry: entry[0]) if slices else (len(self._ids), None)
+            if size == 0:
+                return []
+            if slice_ids is None or limit * len(self._ids) / size < size:
+                found = (self.students[self._ids[k]] for k in range(start, len(self._ids)))
+                return list(itertools.islice((student for student in found if matches(student)), limit))
+            candidates = (
+                i for i in slice_ids() if (after_id is None or i > after_id) and matches(self.students[i])
+            )
+            return [self.students[i] for i in heapq.nsmallest(limit, candidates)]
+
+    def count(self) -> int:
+        return len(self.students)
+
+    def revision(self) -> int:
+        return self._revision
+
+    def epoch(self) -> str:
+        return self._epoch
+
+    def changes(self, since: int, limit: int) -> list:
+        with self._lock:
+            if since > self._revision:
+                raise ChangesUnavailableError(since)
+            if since == self._revision:
+                return []
+            oldest = self._changes[0]["revision"] if self._changes else self._revision + 1
+            if since < oldest - 1:
+                raise ChangesUnavailableError(since)
+            start = since - oldest + 1
+            return [self._changes[i] for i in range(start, min(start + limit, len(self._changes)))]
+
+# `StudentRecord` is how `CompactStudentStore` keeps a student: a slotted object without the per-instance dictionary
+# and validation state of a Pydantic model, holding the fields the indexes need and the student's JSON encoding.
+# The encoding is made once when the record is written, so reads never encode the student again.
+class StudentRecord:
+    __slots__ = ("id", "name", "age", "email", "json")
+
+    def __init__(self, student: Student):
+        self.id = student.id
+        self.name = student.name
+        self.age = student.age
+        self.email = student.email
+        self.json = student.model_dump_json().encode()
+
+    # Records were validated when they were written, so they are turned back into students without validation.
+    def to_student(self) -> Student:
+        return Student.model_construct(id=self.id, name=self.name, age=self.age, email=self.email)
+
+# `CompactStudentStore` is the in-memory store with every student kept as a `StudentRecord` instead of a `Student`,
+# which lets `get_json` and `page_json` return the cached JSON bytes directly. It saves only about a fifth of the
+# memory per record (1094 against 1402 bytes with `benchmark.py --store-benchmark --records 100000`), because the
+# shared indexes (the (age, ID) and (name, ID) tuples, the lower-cased name copies and the trigram sets) take most of
+# it. Indexes, locking and the change log are those of `MemoryStudentStore`; methods that return students
+# rebuild them from the records.
+class CompactStudentStore(MemoryStudentStore):
+    def _index(self, student: Student) -> None:
+        super()._index(StudentRecord(student))
+
+    def get(self, student_id: int):
+        record = self.students.get(student_id)
+        return record.to_student() if record is not None else None
+
+    def get_json(self, student_id: int):
+        record = self.students.get(student_id)
+        return record.json if record is not None else None
+
+    def list_all(self) -> list:
+        return [record.to_student() for record in super().list_all()]
+
+    def page(self, after_id, limit: int) -> list:
+        return [record.to_student() for record in super().page(after_id, limit)]
+
+    def page_json(self, after_id, limit: int) -> list:
+        return [(record.id, record.json) for record in super().page(after_id, limit)]
+
+    def search(self, min_age=None, max_age=None, name_prefix=None, name_contains=None, email=None,
+               after_id=None, limit: int = 100) -> list:
+        records = super().search(min_age, max_age, name_prefix, name_contains, email, after_id, limit)
+        return [record.to_student() for record in records]
+
+# `SQLiteStudentStore` is the durable backend. The database file is opened in WAL mode so that several
+# uvicorn worker processes can share it: readers never block the single writer, and the PRIMARY KEY and
+# UNIQUE constraints make ID and email uniqueness hold across all workers. The database file is itself the
+# snapshot, so startup only opens it and never replays any history, whatever the size of the table.
+# Each row keeps `name_key`, its name lower-cased by Python exactly as the in-memory stores fold names (SQLite's own
+# NOCASE and lower() only fold ASCII), so both backends agree on case-insensitive matches such as "él" in "Élodie".
+# Searches use an index on age, an index on `name_key` for prefixes, the UNIQUE index on email, and an
+# FTS5 trigram index (kept in sync by triggers) for name substrings when the SQLite build includes FTS5.
+# The change log is the `student_changes` table, filled by triggers in the same transaction as each mutation, so the
+# revision order is shared by all worker processes. It is trimmed to about `change_log_size` rows every
+# `CHANGE_TRIM_INTERVAL` rows written.
+# Each thread gets its own connection because sqlite3 connections must not be used concurrently.
+class SQLiteStudentStore(StudentStore):
+    CHANGE_TRIM_INTERVAL = 100
+
+    def __init__(self, path: str, change_log_size: int = 10000):
+        super().__init__()
+        self.path = path
+        self.change_log_size = change_log_size
+        self._writes = 0
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        conn = self._conn()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS students (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                name_key TEXT NOT NULL,
+                age INTEGER NOT NULL,
+                email TEXT NOT NULL UNIQUE
+            );
+            CREATE INDEX IF NOT EXISTS students_age ON students (age);
+            CREATE INDEX IF NOT EXISTS students_name_key ON students (name_key);
+            CREATE TABLE IF NOT EXISTS student_changes (
+                revision INTEGER PRIMARY KEY AUTOINCREMENT,
+                op TEXT NOT NULL,
+                student_id INTEGER NOT NULL,
+                name TEXT,
+                age INTEGER,
+                email TEXT
+            );
+            CREATE TRIGGER IF NOT EXISTS student_changes_insert AFTER INSERT ON students BEGIN
+                INSERT INTO student_changes (op, student_id, name, age, email)
+                VALUES ('insert', new.id, new.name, new.age, new.email);
+            END;
+            CREATE TRIGGER IF NOT EXISTS student_changes_update AFTER UPDATE ON students BEGIN
+                INSERT INTO student_changes (op, student_id, name, age, email)
+                VALUES ('update', new.id, new.name, new.age, new.email);
+            END;
+            CREATE TRIGGER IF NOT EXISTS student_changes_delete AFTER DELETE ON students BEGIN
+                INSERT INTO student_changes (op, student_id) VALUES ('delete', old.id);
+            END;
+            CREATE TABLE IF NOT EXISTS store_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        # The epoch is stored in the database so every worker process reports the same one; whichever opens a new
+        # file first chooses it.
+        conn.execute("INSERT OR IGNORE INTO store_meta (key, value) VALUES ('epoch', ?)", (secrets.token_hex(8),))
+        self._epoch = conn.execute("SELECT value FROM store_meta WHERE key = 'epoch'").fetchone()[0]
+        self.name_fts = self._create_name_fts(conn)
+
+    # The trigram index is built from the existing rows the first time it is created, so databases created
+    # before it existed are indexed too. Returns False if this SQLite build has no FTS5.
+    @staticmethod
+    def _create_name_fts(conn: sqlite3.Connection) -> bool:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'students_name_fts'"
+            ).fetchone() is not None
+            if not exists:
+                conn.execute(
+                    "CREATE VIRTUAL TABLE students_name_fts USING fts5("
+                    "name, content='students', content_rowid='id', tokenize='trigram')"
+                )
+                conn.execute(
+                    "CREATE TRIGGER students_name_fts_insert AFTER INSERT ON students BEGIN "
+                    "INSERT INTO students_name_fts (rowid, name) VALUES (new.id, new.name); END"
+                )
+                conn.execute(
+                    "CREATE TRIGGER students_name_fts_delete AFTER DELETE ON students BEGIN "
+                    "INSERT INTO students_name_fts (students_name_fts, rowid, name) VALUES ('delete', old.id, old.name); END"
+                )
+                conn.execute(
+                    "CREATE TRIGGER students_name_fts_update AFTER UPDATE OF name ON students BEGIN "
+                    "INSERT INTO students_name_fts (students_name_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+                    "INSERT INTO students_name_fts (rowid, name) VALUES (new.id, new.name); END"
+                )
+                conn.execute("INSERT INTO students_name_fts (students_name_fts) VALUES ('rebuild')")
+            conn.execute("COMMIT")
+        except sqlite3.OperationalError:
+            conn.execute("ROLLBACK")
+            return False
+        return True
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None puts the connection in autocommit mode; multi-statement
+            # transactions are opened explicitly with BEGIN IMMEDIATE where needed.
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    # Rows read back from the database were validated when they were written, so they are rebuilt
+    # with `model_construct` instead of being validated a second time.
+    @staticmethod
+    def _row_to_student(row) -> Student:
+        return Student.model_construct(id=row[0], name=row[1], age=row[2], email=row[3])
+
+    # SQLite reports which constraint failed in the IntegrityError message, which is used to tell
+    # a duplicate email apart from a duplicate ID.
+    @staticmethod
+    def _integrity_error(error: sqlite3.IntegrityError, student: Student) -> StoreError:
+        if "students.email" in str(error):
+            return DuplicateEmailError(student.email)
+        return DuplicateIdError(student.id)
+
+    def add(self, student: Student) -> Student:
+        try:
+            self._conn().execute(
+                "INSERT INTO students (id, name, name_key, age, email) VALUES (?, ?, ?, ?, ?)",
+                (student.id, student.name, student.name.lower(), student.age, student.email),
+            )
+        except sqlite3.IntegrityError as e:
+            raise self._integrity_error(e, student) from e
+        self._after_write()
+        return student
+
+    # `_after_write` trims the change log once every `CHANGE_TRIM_INTERVAL` rows written by this process, counting
+    # each row of a batch, and tells the subscribers.
+    def _after_write(self, rows: int = 1) -> None:
+        before = self._writes
+        self._writes += rows
+        if self._writes // self.CHANGE_TRIM_INTERVAL != before // self.CHANGE_TRIM_INTERVAL:
+            self._conn().execute(
+                "DELETE FROM student_changes WHERE revision <= (SELECT MAX(revision) FROM student_changes) - ?",
+                (self.change_log_size,),
+            )
+        self._notify()
+
+    def add_many(self, students: list) -> None:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO students (id, name, name_key, age, email) VALUES (?, ?, ?, ?, ?)",
+                ((student.id, student.name, student.name.lower(), student.age, student.email) for student in students),
+            )
+        except sqlite3.IntegrityError as e:
+            conn.execute("ROLLBACK")
+            if "students.email" in str(e):
+                raise DuplicateEmailError(str(e)) from e
+            raise DuplicateIdError(str(e)) from e
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        self._after_write(len(students))
+
+    # The lookups are split into groups so each query stays below SQLite's limit on bound parameters.
+    def find_existing(self, ids, emails) -> tuple:
+        conn = self._conn()
+        found_ids = set()
+        found_emails = set()
+        ids = list(ids)
+        emails = list(emails)
+        for start in range(0, len(ids), 500):
+            group = ids[start:start + 500]
+            placeholders = ",".join("?" * len(group))
+            found_ids.update(row[0] for row in conn.execute(
+                f"SELECT id FROM students WHERE id IN ({placeholders})", group
+            ))
+        for start in range(0, len(emails), 500):
+            group = emails[start:start + 500]
+            placeholders = ",".join("?" * len(group))
+            found_emails.update(row[0] for row in conn.execute(
+                f"SELECT email FROM students WHERE email IN ({placeholders})", group
+            ))
+        return found_ids, found_emails
+
+    def get(self, student_id: int):
+        row = self._conn().execute(
+            "SELECT id, name, age, email FROM students WHERE id = ?", (student_id,)
+        ).fetchone()
+        return self._row_to_student(row) if row else None
+
+    def update(self, student_id: int, student: Student) -> Student:
+        try:
+            cursor = self._conn().execute(
+                "UPDATE students SET name = ?, name_key = ?, age = ?, email = ? WHERE id = ?",
+                (student.name, student.name.lower(), student.age, student.email, student_id),
+            )
+        except sqlite3.IntegrityError as e:
+            raise self._integrity_error(e, student) from e
+        if cursor.rowcount == 0:
+            raise StudentNotFoundError(student_id)
+        self._after_write()
+        return student.model_copy(update={"id": student_id})
+
+    def delete(self, student_id: int) -> None:
+        cursor = self._conn().execute("DELETE FROM students WHERE id = ?", (student_id,))
+        if cursor.rowcount == 0:
+            raise StudentNotFoundError(student_id)
+        self._after_write()
+
+    def list_all(self) -> list:
+        rows = self._conn().execute("SELECT id, name, age, email FROM students ORDER BY id")
+        return [self._row_to_student(row) for row in rows]
+
+    def page(self, after_id, limit: int) -> list:
+        if after_id is None:
+            rows = self._conn().execute("SELECT id, name, age, email FROM students ORDER BY id LIMIT ?", (limit,))
+        else:
+            rows = self._conn().execute(
+                "SELECT id, name, age, email FROM students WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit)
+            )
+        return [self._row_to_student(row) for row in rows]
+
+    def search(self, min_age=None, max_age=None, name_prefix=None, name_contains=None, email=None,
+               after_id=None, limit: int = 100) -> list:
+        clauses = []
+        params = []
+        if after_id is not None:
+            clauses.append("id > ?")
+            params.append(after_id)
+        if email is not None:
+            clauses.append("email = ?")
+            params.append(email)
+        if min_age is not None:
+            clauses.append("age >= ?")
+            params.append(min_age)
+        if max_age is not None:
+            clauses.append("age <= ?")
+            params.append(max_age)
+        if name_prefix is not None:
+            # A range on the `name_key` index: every name starting with the prefix sorts between these bounds.
+            prefix = name_prefix.lower()
+            clauses.append("name_key >= ? AND name_key < ?")
+            params.extend([prefix, prefix + "\U0010ffff"])
+        if name_contains is not None:
+            if self.name_fts and len(name_contains) >= 3:
+                clauses.append("id IN (SELECT rowid FROM students_name_fts WHERE students_name_fts MATCH ?)")
+                params.append('"' + name_contains.replace('"', '""') + '"')
+            else:
+                clauses.append("instr(name_key, ?) > 0")
+                params.append(name_contains.lower())
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._conn().execute(
+            f"SELECT id, name, age, email FROM students {where} ORDER BY id LIMIT ?", (*params, limit)
+        )
+        return [self._row_to_student(row) for row in rows]
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM students").fetchone()[0]
+
+    # AUTOINCREMENT keeps the highest revision ever used in `sqlite_sequence`, even after the log is trimmed.
+    def revision(self) -> int:
+        row = self._conn().execute("SELECT seq FROM sqlite_sequence WHERE name = 'student_changes'").fetchone()
+        return row[0] if row else 0
+
+    def epoch(self) -> str:
+        return self._epoch
+
+    # The read runs in one transaction so the revision and the log rows come from the same snapshot.
+    def changes(self, since: int, limit: int) -> list:
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            current = self.revision()
+            if since > current:
+                raise ChangesUnavailableError(since)
+            if since == current:
+                return []
+            oldest = conn.execute("SELECT MIN(revision) FROM student_changes").fetchone()[0]
+            if oldest is None or since < oldest - 1:
+                raise ChangesUnavailableError(since)
+            rows = conn.execute(
+                "SELECT revision, op, student_id, name, age, email FROM student_changes "
+                "WHERE revision > ? ORDER BY revision LIMIT ?",
+                (since, limit),
+            ).fetchall()
+        finally:
+            conn.execute("COMMIT")
+        return [
+            make_change(row[0], row[1], row[2], self._row_to_student(row[2:]) if row[1] != "delete" else None)
+            for row in rows
+        ]
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+# `open_store` picks the backend from the environment. `STUDENT_STORE` selects the backend
+# (`sqlite` by default, `memory` or `compact`), `STUDENT_DB_PATH` sets the SQLite database file, and
+# `STUDENT_CHANGE_LOG_SIZE` is how many changes are kept for incremental sync.
+def open_store() -> StudentStore:
+    backend = os.environ.get("STUDENT_STORE", "sqlite").lower()
+    change_log_size = int(os.environ.get("STUDENT_CHANGE_LOG_SIZE", "10000"))
+    if backend == "memory":
+        return MemoryStudentStore(change_log_size)
+    if backend == "compact":
+        return CompactStudentStore(change_log_size)
+    if backend == "sqlite":
+        return SQLiteStudentStore(os.environ.get("STUDENT_DB_PATH", "students.db"), change_log_size)
+    raise ValueError(f"Unknown STUDENT_STORE backend: {backend}")
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from models import Student
+
+# `SummaryCache` keeps generated student summaries so repeat reads of `/students/{id}/summary` do not call Ollama
+# again. Entries are content-addressed: the key is a hash of the student's name, age and email together with the
+# model and prompt template, so a changed student or a new prompt can never be served a stale summary, even by
+# another worker process. The cache is bounded (least recently used entries are evicted first) and entries expire
+# after `ttl_seconds`. If `path` is set, the cache is loaded from that JSON file on startup, so a warm cache survives
+# restarts. Changes are saved by a background timer at most once every `save_delay` seconds, never by the request
+# that made them, and a failed save is reported and otherwise ignored. Each save merges in the entries other worker
+# processes saved to the same file, so workers sharing the file do not overwrite each other's summaries.
+class SummaryCache:
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 86400, path: Optional[str] = None,
+                 save_delay: float = 5.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self.save_delay = save_delay
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._keys_by_student = {}
+        self._lock = threading.Lock()
+        self._save_timer = None
+        if path:
+            for key, student_id, summary, created in self._read_file()[-max_entries:]:
+                self._entries[key] = (student_id, summary, created)
+                self._keys_by_student[student_id] = key
+
+    # `make_key` builds the content address of a summary from everything that affects the generated text.
+    @staticmethod
+    def make_key(student: Student, model: str, prompt_template: str) -> str:
+        content = json.dumps([student.name, student.age, student.email, model, prompt_template])
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[2] > self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, student_id: int, key: str, summary: str) -> None:
+        with self._lock:
+            old_key = self._keys_by_student.get(student_id)
+            if old_key is not None and old_key != key:
+                self._entries.pop(old_key, None)
+            self._entries[key] = (student_id, summary, time.time())
+            self._entries.move_to_end(key)
+            self._keys_by_student[student_id] = key
+            while len(self._entries) > self.max_entries:
+                evicted_key, (evicted_id, _, _) = self._entries.popitem(last=False)
+                if self._keys_by_student.get(evicted_id) == evicted_key:
+                    del self._keys_by_student[evicted_id]
+            self._schedule_save()
+
+    # `invalidate` drops the cached summary of a student. It is called when the student is updated or deleted
+    # so that memory is not held by entries that can no longer be hit.
+    def invalidate(self, student_id: int) -> None:
+        with self._lock:
+            key = self._keys_by_student.pop(student_id, None)
+            if key is not None and self._entries.pop(key, None) is not None:
+                self._schedule_save()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+    # `close` saves pending changes right away; it is called when the app shuts down.
+    def close(self) -> None:
+        with self._lock:
+            timer, self._save_timer = self._save_timer, None
+        if timer is not None:
+            timer.cancel()
+            self.save()
+
+    # Must be called with the lock held. Changes made while a save is pending are picked up by that save.
+    def _schedule_save(self) -> None:
+        if self.path and self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_delay, self._timed_save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _timed_save(self) -> None:
+        with self._lock:
+            self._save_timer = None
+        self.save()
+
+    # `save` merges the entries in memory with those in the file, keeping the newest `max_entries`, and writes the
+    # result. Only copying the entries happens under the lock. The data is written to a temporary file unique to this
+    # process and then renamed over the old file, so a crash or a concurrent save by another worker never leaves a
+    # half-written cache behind.
+    def save(self) -> None:
+        with self._lock:
+            entries = [[key, *entry] for key, entry in self._entries.items()]
+        try:
+            now = time.time()
+            merged = {entry[0]: entry for entry in self._read_file()}
+            merged.update((entry[0], entry) for entry in entries)
+            data = [entry for entry in merged.values() if now - entry[3] <= self.ttl_seconds]
+            data.sort(key=lambda entry: entry[3])
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".summary-cache-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data[-self.max_entries:], f)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except (OSError, ValueError) as e:
+            print(f"Could not save summary cache to {self.path}: {e!r}")
+
+    # `_read_file` returns the unexpired entries saved in the cache file, oldest first, or none if it is unreadable.
+    def _read_file(self) -> list:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError):
+            print(f"Ignoring unreadable summary cache file: {self.path}")
+            return []
+        now = time.time()
+        return [entry for entry in data if now - entry[3] <= self.ttl_seconds]
@@ -0,0 +1,248 @@
+import asyncio
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Bulk summary jobs generate summaries for many students in the background. A job is a list of student IDs; its
+# items are stored in SQLite together with their status, attempts, summary and error, so progress and partial results
+# can be polled while the job runs and an interrupted job is picked up again after a restart.
+
+# `PermanentJobError` marks a failure that retrying cannot fix (for example a student that no longer exists),
+# so the item is failed immediately instead of being retried.
+class PermanentJobError(Exception):
+    pass
+
+# `SummaryJobManager` owns the job database and the background tasks. `summarize` is an async function taking a
+# student ID and returning the summary text. A semaphore caps how many summaries this process generates at once across
+# all of its jobs (with several worker processes the total is that many per process), and each item is retried with a
+# growing delay up to `max_attempts` times.
+#
+# Items are claimed with an atomic UPDATE that records this manager as their `owner` together with a lease expiry
+# time. While the manager runs, a heartbeat renews the leases of its items every quarter of `lease_seconds`, so
+# several worker processes sharing the database never process the same item twice. An item whose lease expired
+# (because its process stopped) is claimed again by whichever manager finds it first.
+#
+# Every database call runs on a single thread of the manager's own, never on the event loop: with several workers
+# sharing the database a write may wait for the lock for up to the busy timeout, and that must not stall the routes.
+class SummaryJobManager:
+    def __init__(self, path: str, summarize, concurrency: int = 4, max_attempts: int = 3, retry_delay: float = 1.0,
+                 lease_seconds: float = 60.0):
+        self.path = path
+        self.summarize = summarize
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease_seconds = lease_seconds
+        self.owner = uuid.uuid4().hex
+        self._semaphore = None
+        self._heartbeat = None
+        self._tasks = {}
+        self._conn = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summary-jobs")
+        conn = self._db()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS summary_jobs (
+                id TEXT PRIMARY KEY,
+                created REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS summary_job_items (
+                job_id TEXT NOT NULL,
+                student_id INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                summary TEXT,
+                error TEXT,
+                owner TEXT,
+                lease_until REAL,
+                PRIMARY KEY (job_id, student_id)
+            );
+            """
+        )
+
+    # The connection is opened on first use and reopened after `aclose`. Apart from the schema setup in `__init__`, it
+    # is only used from the executor thread.
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA busy_timeout=30000")
+        return self._conn
+
+    # `_in_db_thread` runs `func(*args)` on the database thread and returns its result.
+    async def _in_db_thread(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    # `_execute` runs one statement on the database thread and returns all its rows.
+    async def _execute(self, sql: str, params=()) -> list:
+        return await self._in_db_thread(lambda: self._db().execute(sql, params).fetchall())
+
+    # `create` records a new job with one pending item per distinct student ID and returns the job ID.
+    async def create(self, student_ids) -> str:
+        return await self._in_db_thread(self._insert_job, list(student_ids))
+
+    def _insert_job(self, student_ids: list) -> str:
+        job_id = uuid.uuid4().hex
+        conn = self._db()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT INTO summary_jobs (id, created) VALUES (?, ?)", (job_id, time.time()))
+            conn.executemany(
+                "INSERT OR IGNORE INTO summary_job_items (job_id, student_id) VALUES (?, ?)",
+                ((job_id, student_id) for student_id in student_ids),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return job_id
+
+    # `start` runs a job in the background on the current event loop.
+    def start(self, job_id: str) -> None:
+        if job_id not in self._tasks:
+            task = asyncio.create_task(self._run(job_id))
+            self._tasks[job_id] = task
+            task.add_done_callback(lambda done: self._tasks.pop(job_id, None))
+
+    # `resume` starts the heartbeat and every job that has items waiting to be claimed: pending items, or running items
+    # whose lease expired because the process working on them stopped. Items other processes are still working on
+    # are left alone. The heartbeat repeats this check, so work abandoned by a crashed worker is picked up later too.
+    async def resume(self) -> None:
+        if self._heartbeat is None:
+            self._heartbeat = asyncio.create_task(self._beat())
+        rows = await self._execute(
+            "SELECT DISTINCT job_id FROM summary_job_items "
+            "WHERE status = 'pending' OR (status = 'running' AND lease_until < ?)",
+            (time.time(),),
+        )
+        for (job_id,) in rows:
+            self.start(job_id)
+
+    async def _beat(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 4)
+            try:
+                await self._execute(
+                    "UPDATE summary_job_items SET lease_until = ? WHERE owner = ? AND status = 'running'",
+                    (time.time() + self.lease_seconds, self.owner),
+                )
+                await self.resume()
+            except sqlite3.Error as e:
+                print(f"Summary job heartbeat failed: {e!r}")
+
+    async def aclose(self) -> None:
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        # Hand this process's unfinished items back right away instead of waiting for their leases to expire.
+        await self._execute(
+            "UPDATE summary_job_items SET status = 'pending', owner = NULL WHERE owner = ? AND status = 'running'",
+            (self.owner,),
+        )
+        await self._in_db_thread(self._close_db)
+
+    def _close_db(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # `get` reports the progress of a job, or returns None if it does not exist. Finished items (done or failed)
+    # are included as partial results, paged by student ID with `after_id` and `limit`.
+    async def get(self, job_id: str, after_id=None, limit: int = 100):
+        return await self._in_db_thread(self._read_job, job_id, after_id, limit)
+
+    def _read_job(self, job_id: str, after_id, limit: int):
+        conn = self._db()
+        if conn.execute("SELECT 1 FROM summary_jobs WHERE id = ?", (job_id,)).fetchone() is None:
+            return None
+        counts = dict(conn.execute(
+            "SELECT status, COUNT(*) FROM summary_job_items WHERE job_id = ? GROUP BY status", (job_id,)
+        ).fetchall())
+        after = "" if after_id is None else "AND student_id > ? "
+        rows = conn.execute(
+            "SELECT student_id, status, attempts, summary, error FROM summary_job_items "
+            f"WHERE job_id = ? {after}AND status IN ('done', 'failed') ORDER BY student_id LIMIT ?",
+            (job_id, limit) if after_id is None else (job_id, after_id, limit),
+        ).fetchall()
+        unfinished = counts.get("pending", 0) + counts.get("running", 0)
+        results = [
+            {"student_id": row[0], "status": row[1], "attempts": row[2], "summary": row[3], "error": row[4]}
+            for row in rows
+        ]
+        return {
+            "job_id": job_id,
+            "status": "running" if unfinished else "completed",
+            "total": sum(counts.values()),
+            "pending": counts.get("pending", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "results": results,
+            "next_after_id": results[-1]["student_id"] if len(results) == limit else None,
+        }
+
+    async def _run(self, job_id: str) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        workers = [asyncio.create_task(self._work(job_id)) for _ in range(self.concurrency)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    # `_execute` reads the claimed row with fetchall, so the UPDATE ... RETURNING statement runs to completion and commits.
+    async def _claim(self, job_id: str):
+        now = time.time()
+        claimable = "(status = 'pending' OR (status = 'running' AND lease_until < ?))"
+        rows = await self._execute(
+            "UPDATE summary_job_items SET status = 'running', owner = ?, lease_until = ? "
+            "WHERE job_id = ? AND student_id = ("
+            f"SELECT student_id FROM summary_job_items WHERE job_id = ? AND {claimable} "
+            f"ORDER BY student_id LIMIT 1) AND {claimable} "
+            "RETURNING student_id, attempts",
+            (self.owner, now + self.lease_seconds, job_id, job_id, now, now),
+        )
+        return rows[0] if rows else None
+
+    async def _work(self, job_id: str) -> None:
+        while True:
+            claimed = await self._claim(job_id)
+            if claimed is None:
+                return
+            student_id, attempts = claimed
+            await self._process(job_id, student_id, attempts)
+
+    # The semaphore is only held while a summary is being generated, not while waiting to retry.
+    async def _process(self, job_id: str, student_id: int, attempts: int) -> None:
+        while True:
+            attempts += 1
+            try:
+                async with self._semaphore:
+                    summary = await self.summarize(student_id)
+            except Exception as e:
+                permanent = isinstance(e, PermanentJobError)
+                if permanent or attempts >= self.max_attempts:
+                    await self._finish(job_id, student_id, "failed", attempts, None, str(e))
+                    return
+                await self._execute(
+                    "UPDATE summary_job_items SET attempts = ?, error = ? "
+                    "WHERE job_id = ? AND student_id = ? AND owner = ?",
+                    (attempts, str(e), job_id, student_id, self.owner),
+                )
+                await asyncio.sleep(self.retry_delay * attempts)
+            else:
+                await self._finish(job_id, student_id, "done", attempts, summary, None)
+                return
+
+    # Only the current owner may finish an item, so a process that lost its lease cannot overwrite another's result.
+    async def _finish(self, job_id: str, student_id: int, status: str, attempts: int, summary, error) -> None:
+        await self._execute(
+            "UPDATE summary_job_items SET status = ?, attempts = ?, summary = ?, error = ?, owner = NULL "
+            "WHERE job_id = ? AND student_id = ? AND owner = ?",
+            (status, attempts, summary, error, job_id, student_id, self.owner),
+        )
@@ -0,0 +1,153 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+
+from metrics import SUMMARY_QUEUE_WAIT
+
+# Admission control for summary generation. Ollama serves only a few generations at once, so every call to the model
+# takes a slot from `SummaryScheduler` first. Callers that find every slot busy wait in a priority queue, and once the
+# queue is full new callers are turned away at once instead of piling up until they time out.
+#
+# Priority classes: a lower number is served first, and callers of the same class are served in arrival order.
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+# `SchedulerFullError` is raised when a caller cannot be queued. `retry_after` is an estimate, in whole seconds,
+# of when a slot is likely to be free, for the `Retry-After` header of the 429 response.
+class SchedulerFullError(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("The summary service is busy. Please try again later.")
+        self.retry_after = retry_after
+
+# `SummaryScheduler` hands out `concurrency` slots. When all are taken, callers wait in a heap ordered by priority and
+# arrival. A caller is rejected when `max_queue` callers of its own or a higher priority are already waiting, so a
+# backlog of batch work never causes interactive requests to be rejected. A released slot is handed straight to the
+# next waiter. Waiters that give up (for example because the client disconnected) are skipped.
+# A waiter can be given a `key` (the summary cache key), so that when a more urgent caller comes to share its result,
+# `raise_priority` moves it forward instead of leaving the urgent caller stuck behind lower-priority work. The waiter
+# is pushed again at the new priority and its old heap entry is skipped once popped.
+# It keeps the queue depth, wait times and an average of how long a slot is held, which is used for `retry_after`.
+# All methods must be called from the event loop thread.
+class SummaryScheduler:
+    def __init__(self, concurrency: int = 1, max_queue: int = 32):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self._active = 0
+        self._heap = []
+        self._order = itertools.count()
+        self._queued = {}
+        self._keys = {}
+        self._waiting = {priority: 0 for priority in PRIORITY_NAMES}
+        self._rejected = {priority: 0 for priority in PRIORITY_NAMES}
+        self._granted = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._service_time = None
+
+    def _ahead(self, priority: int) -> int:
+        return sum(count for waiting_priority, count in self._waiting.items() if waiting_priority <= priority)
+
+    def retry_after(self, priority: int = INTERACTIVE) -> int:
+        service_time = self._service_time if self._service_time is not None else 1.0
+        return max(1, math.ceil(service_time * (self._ahead(priority) + 1) / self.concurrency))
+
+    # `ensure_capacity` raises `SchedulerFullError` if a caller of this priority would be rejected right now. Routes
+    # that start a response before taking a slot use it to answer 429 while they still can.
+    def ensure_capacity(self, priority: int = INTERACTIVE) -> None:
+        if self._active >= self.concurrency and self._ahead(priority) >= self.max_queue:
+            self._rejected[priority] += 1
+            raise SchedulerFullError(self.retry_after(priority))
+
+    def _granted_after(self, priority: int, waited: float) -> None:
+        self._granted += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        SUMMARY_QUEUE_WAIT.observe(waited, priority=PRIORITY_NAMES[priority])
+
+    async def acquire(self, priority: int = INTERACTIVE, key=None) -> None:
+        if self._active < self.concurrency:
+            self._active += 1
+            self._granted_after(priority, 0.0)
+            return
+        self.ensure_capacity(priority)
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (priority, next(self._order), future))
+        self._queued[future] = (priority, time.monotonic())
+        self._waiting[priority] += 1
+        if key is not None:
+            self._keys[key] = future
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the caller gave up, so pass it on.
+                self.release()
+            else:
+                future.cancel()
+                priority, _ = self._queued.pop(future)
+                self._waiting[priority] -= 1
+            raise
+        finally:
+            if key is not None and self._keys.get(key) is future:
+                del self._keys[key]
+
+    # `raise_priority` moves the waiter queued under `key` up to `priority`, if it is waiting at a lower one.
+    def raise_priority(self, key, priority: int) -> None:
+        future = self._keys.get(key)
+        if future is None or future not in self._queued:
+            return
+        current, queued = self._queued[future]
+        if current <= priority:
+            return
+        heapq.heappush(self._heap, (priority, next(self._order), future))
+        self._queued[future] = (priority, queued)
+        self._waiting[current] -= 1
+        self._waiting[priority] += 1
+
+    def release(self) -> None:
+        while self._heap:
+            priority, _, future = heapq.heappop(self._heap)
+            if future.done() or self._queued[future][0] != priority:
+                continue
+            _, queued = self._queued.pop(future)
+            self._waiting[priority] -= 1
+            self._granted_after(priority, time.monotonic() - queued)
+            future.set_result(None)
+            return
+        self._active -= 1
+
+    # `slot` holds a slot for the duration of a `with` block and updates the average time a slot is held.
+    @asynccontextmanager
+    async def slot(self, priority: int = INTERACTIVE, key=None):
+        await self.acquire(priority, key)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            held = time.monotonic() - started
+            self._service_time = held if self._service_time is None else 0.8 * self._service_time + 0.2 * held
+            self.release()
+
+    def queued(self) -> int:
+        return sum(self._waiting.values())
+
+    def active(self) -> int:
+        return self._active
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "active": self._active,
+            "queued": {PRIORITY_NAMES[priority]: count for priority, count in self._waiting.items()},
+            "granted": self._granted,
+            "rejected": {PRIORITY_NAMES[priority]: count for priority, count in self._rejected.items()},
+            "average_wait_seconds": self._wait_total / self._granted if self._granted else 0.0,
+            "max_wait_seconds": self._wait_max,
+            "average_service_seconds": self._service_time or 0.0,
+            "retry_after_seconds": self.retry_after(INTERACTIVE),
+        }
@@ -0,0 +1,86 @@
+import pytest
+
+from models import Student
+from student_store import (
+    ChangesUnavailableError,
+    CompactStudentStore,
+    MemoryStudentStore,
+    SQLiteStudentStore,
+)
+
+BACKENDS = ["memory", "compact", "sqlite"]
+
+def make_store(backend: str, tmp_path, change_log_size: int = 10000):
+    if backend == "memory":
+        return MemoryStudentStore(change_log_size)
+    if backend == "compact":
+        return CompactStudentStore(change_log_size)
+    return SQLiteStudentStore(str(tmp_path / "students.db"), change_log_size)
+
+@pytest.fixture(params=BACKENDS)
+def store(request, tmp_path):
+    store = make_store(request.param, tmp_path)
+    yield store
+    store.close()
+
+def student(student_id: int, name: str = "Student", age: int = 20) -> Student:
+    return Student(id=student_id, name=f"{name} {student_id}", age=age, email=f"student{student_id}@example.com")
+
+def test_changes_record_every_mutation_in_order(store):
+    assert store.revision() == 0
+    assert store.changes(0, 10) == []
+    store.add(student(1))
+    store.add_many([student(2), student(3)])
+    store.update(2, student(2, name="Renamed"))
+    store.delete(3)
+    assert store.revision() == 5
+    changes = store.changes(0, 10)
+    assert [(change["revision"], change["op"], change["id"]) for change in changes] == [
+        (1, "insert", 1), (2, "insert", 2), (3, "insert", 3), (4, "update", 2), (5, "delete", 3),
+    ]
+    assert changes[3]["student"]["name"] == "Renamed 2"
+    assert changes[4]["student"] is None
+
+def test_changes_are_paged_from_since(store):
+    store.add_many([student(i) for i in range(1, 6)])
+    assert [change["revision"] for change in store.changes(1, 2)] == [2, 3]
+    assert [change["revision"] for change in store.changes(3, 10)] == [4, 5]
+
+def test_changes_at_the_current_revision_are_empty(store):
+    store.add(student(1))
+    assert store.changes(1, 10) == []
+
+def test_changes_ahead_of_the_store_are_unavailable(store):
+    store.add(student(1))
+    with pytest.raises(ChangesUnavailableError):
+        store.changes(2, 10)
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_changes_older_than_the_log_are_unavailable(backend, tmp_path):
+    store = make_store(backend, tmp_path, change_log_size=10)
+    # Enough rows for the SQLite store to trim its log as well.
+    store.add_many([student(i) for i in range(1, SQLiteStudentStore.CHANGE_TRIM_INTERVAL + 1)])
+    with pytest.raises(ChangesUnavailableError):
+        store.changes(0, 10)
+    latest = store.revision()
+    assert [change["revision"] for change in store.changes(latest - 2, 10)] == [latest - 1, latest]
+    store.close()
+
+def test_epoch_is_stable_for_a_store(store):
+    epoch = store.epoch()
+    assert epoch
+    store.add(student(1))
+    assert store.epoch() == epoch
+
+@pytest.mark.parametrize("backend", ["memory", "compact"])
+def test_each_in_memory_store_gets_its_own_epoch(backend, tmp_path):
+    assert make_store(backend, tmp_path).epoch() != make_store(backend, tmp_path).epoch()
+
+def test_sqlite_epoch_belongs_to_the_database_file(tmp_path):
+    first = SQLiteStudentStore(str(tmp_path / "first.db"))
+    reopened = SQLiteStudentStore(str(tmp_path / "first.db"))
+    other = SQLiteStudentStore(str(tmp_path / "other.db"))
+    assert first.epoch() == reopened.epoch()
+    assert first.epoch() != other.epoch()
+    for store in (first, reopened, other):
+        store.close()
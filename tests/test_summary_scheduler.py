@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+from summary_scheduler import BATCH, INTERACTIVE, SchedulerFullError, SummaryScheduler
+
+# The tests drive the scheduler from plain coroutines with `asyncio.run`. `settle` lets the queued tasks run up to
+# their next await, so they are in the heap (or have been handed a slot) before the test goes on.
+async def settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+def test_rejects_once_the_queue_is_full():
+    async def main():
+        scheduler = SummaryScheduler(concurrency=1, max_queue=2)
+        await scheduler.acquire(BATCH)
+        waiters = [asyncio.create_task(scheduler.acquire(BATCH)) for _ in range(2)]
+        await settle()
+        with pytest.raises(SchedulerFullError) as error:
+            await scheduler.acquire(BATCH)
+        assert error.value.retry_after >= 1
+        assert scheduler.stats()["rejected"] == {"interactive": 0, "batch": 1}
+        # Waiting batch work does not count against interactive callers.
+        scheduler.ensure_capacity(INTERACTIVE)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        assert scheduler.queued() == 0
+
+    asyncio.run(main())
+
+def test_interactive_callers_count_against_batch_callers():
+    async def main():
+        scheduler = SummaryScheduler(concurrency=1, max_queue=2)
+        await scheduler.acquire(INTERACTIVE)
+        waiters = [asyncio.create_task(scheduler.acquire(INTERACTIVE)) for _ in range(2)]
+        await settle()
+        with pytest.raises(SchedulerFullError):
+            scheduler.ensure_capacity(INTERACTIVE)
+        with pytest.raises(SchedulerFullError):
+            scheduler.ensure_capacity(BATCH)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+    asyncio.run(main())
+
+def test_serves_higher_priority_first_then_arrival_order():
+    async def main():
+        scheduler = SummaryScheduler(concurrency=1, max_queue=8)
+        await scheduler.acquire()
+        order = []
+
+        async def wait(name, priority):
+            async with scheduler.slot(priority):
+                order.append(name)
+
+        tasks = [asyncio.create_task(wait("batch 1", BATCH))]
+        await settle()
+        tasks.append(asyncio.create_task(wait("batch 2", BATCH)))
+        await settle()
+        tasks.append(asyncio.create_task(wait("interactive", INTERACTIVE)))
+        await settle()
+        scheduler.release()
+        await asyncio.gather(*tasks)
+        assert order == ["interactive", "batch 1", "batch 2"]
+        assert scheduler.active() == 0
+
+    asyncio.run(main())
+
+def test_raise_priority_moves_a_queued_waiter_forward():
+    async def main():
+        scheduler = SummaryScheduler(concurrency=1, max_queue=8)
+        await scheduler.acquire()
+        order = []
+
+        async def wait(key):
+            async with scheduler.slot(BATCH, key=key):
+                order.append(key)
+
+        tasks = [asyncio.create_task(wait("first")), asyncio.create_task(wait("second"))]
+        await settle()
+        scheduler.raise_priority("second", INTERACTIVE)
+        assert scheduler.stats()["queued"] == {"interactive": 1, "batch": 1}
+        # Raising to the same or a lower priority, or an unknown key, changes nothing.
+        scheduler.raise_priority("second", BATCH)
+        scheduler.raise_priority("missing", INTERACTIVE)
+        assert scheduler.stats()["queued"] == {"interactive": 1, "batch": 1}
+        scheduler.release()
+        await asyncio.gather(*tasks)
+        assert order == ["second", "first"]
+        assert scheduler.queued() == 0
+        assert scheduler.active() == 0
+
+    asyncio.run(main())
+
+def test_cancelled_waiter_after_promotion_leaves_no_count_behind():
+    async def main():
+        scheduler = SummaryScheduler(concurrency=1, max_queue=8)
+        await scheduler.acquire()
+        waiter = asyncio.create_task(scheduler.acquire(BATCH, key="key"))
+        await settle()
+        scheduler.raise_priority("key", INTERACTIVE)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert scheduler.queued() == 0
+        scheduler.release()
+        assert scheduler.active() == 0
+
+    asyncio.run(main())
+
+def test_slot_handed_to_a_cancelled_waiter_is_passed_on():
+    async def main():
+        scheduler = SummaryScheduler(concurrency=1, max_queue=8)
+        await scheduler.acquire()
+        first = asyncio.create_task(scheduler.acquire(BATCH))
+        second = asyncio.create_task(scheduler.acquire(BATCH))
+        await settle()
+        # The slot goes to `first`, which gives up before it gets to run.
+        scheduler.release()
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        await asyncio.wait_for(second, 1)
+        assert scheduler.active() == 1
+        assert scheduler.queued() == 0
+        scheduler.release()
+        assert scheduler.active() == 0
+
+    asyncio.run(main())